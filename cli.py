@@ -0,0 +1,67 @@
+"""
+프롬프톤 도구 통합 진입점.
+
+    python cli.py <command> [options]
+    python cli.py evaluate --true_df data/train_dataset.csv --pred_df submission.csv
+
+서브커맨드 모듈(pandas, openai, tiktoken 등 무거운 의존성 포함)은 해당 서브커맨드가 실행될 때만 import 합니다.
+따라서 `python cli.py --help`나 잘못된 서브커맨드는 표준 라이브러리만으로 즉시 응답합니다.
+"""
+import importlib
+import os
+import sys
+
+# 서브커맨드 -> (모듈 경로, 설명). 모듈은 main(argv=None)을 제공해야 합니다.
+COMMANDS = {
+    "generate": ("src.baseline_generate", "Baseline 프롬프트로 교정문 생성"),
+    "multi-turn": ("src.multi_turn_generate", "Multi-Turn(XML) 전략으로 교정문 생성"),
+    "retry": ("src.retry_generate", "FM 후보 CoT 재교정 (Self-Consistency 옵션)"),
+    "retry-v2": ("src.retry_generate_v2", "FM 후보 2-Step XML 재교정 (2000 토큰 안전 로직)"),
+    "queue": ("src.work_queue", "SQLite lease 작업 큐로 다중 프로세스/다중 키 생성 (init/work/status/collect)"),
+    "oracle": ("src.oracle", "후보 제출 파일들의 행 단위 선택 정책 탐색 (학습셋 F1)"),
+    "filter": ("filter_fm_candidates", "예산 내 재교정 후보 선별"),
+    "merge": ("merge_final_submission", "교정 레이어를 제출 파일에 병합"),
+    "evaluate": ("src.evaluate", "제출 파일 평가 (Recall/Precision)"),
+    "truth-store": ("src.truth_store", "정답 CSV를 미리 토큰화한 메모리 매핑 바이너리로 컴파일 (compile/info)"),
+    "eval-daemon": ("src.eval_daemon", "정답을 미리 로드한 로컬 평가 데몬 (serve/score/stop)"),
+    "experiment": ("src.experiment", "프롬프트 변형 A/B 실험 (층화 점진 표본 + 순차 검정 조기 탈락)"),
+    "analyze": ("src.analysis.eda_failure_analysis", "FN / FP+FR 실패 사례 분석"),
+    "edits": ("src.analysis.edit_queries", "편집 단위 인덱스 집계 쿼리 (놓친 교정, 조사별 FR 등)"),
+    "clusters": ("src.analysis.failure_clusters", "FM/FP 편집을 MinHash/LSH로 묶은 실패 패턴 클러스터"),
+    "tokens": ("check_tokens", "Solar Pro 2 토크나이저로 프롬프트 토큰 수 확인"),
+}
+
+
+def print_usage(stream=sys.stdout):
+    print("usage: python cli.py <command> [options]\n", file=stream)
+    print("commands:", file=stream)
+    for name, (_, description) in COMMANDS.items():
+        print(f"  {name:<12} {description}", file=stream)
+    print("\n`python cli.py <command> --help` shows the options of each command.", file=stream)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        print_usage()
+        return 0
+
+    name, rest = argv[0], argv[1:]
+    if name not in COMMANDS:
+        print(f"Unknown command: {name}\n", file=sys.stderr)
+        print_usage(sys.stderr)
+        return 2
+
+    # 모든 서브커맨드가 `from src.X import ...` 형태로 import 되도록 프로젝트 루트를 경로에 추가
+    project_root = os.path.dirname(os.path.abspath(__file__))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+    # argparse의 usage/prog 표시를 `cli.py <command>`로 맞춤
+    sys.argv[0] = f"{os.path.basename(__file__)} {name}"
+    module = importlib.import_module(COMMANDS[name][0])
+    return module.main(rest)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,37 +1,192 @@
 import pandas as pd
 import argparse
+import os
+from typing import Callable, Dict, Optional, Sequence
 
-def filter_fm(input_csv: str, output_csv: str):
+# 규칙 기반 빠른 스캔용 의심 패턴 (자주 틀리는 맞춤법/띄어쓰기/문장 부호)
+SUSPICIOUS_PATTERNS = [
+    r'됬', r'되요', r'되서', r'안되', r'몇일', r'[할갈볼줄]께', r'어떻해', r'않 ',
+    r'웬지', r'왠만', r'금새', r'역활', r'일일히', r'깨끗히', r'오랫만', r'바램',
+    r'(갈|할|볼|올|먹을)려고',             # ㄹ려고 → 려고
+    r'[가-힣](수|줄)(있|없)',               # 의존명사 띄어쓰기
+    r'[가-힣]것같',
+    r'\s{2,}', r'\s[,.!?]',                 # 공백/문장 부호
+    r'[가-힣]$',                            # 문장 끝 마침표 누락
+]
+SUSPICIOUS_REGEX = '|'.join(f'(?:{p})' for p in SUSPICIOUS_PATTERNS)
+
+# 점수 신호 레지스트리: 이름 -> (DataFrame, history) -> [0, 1] 범위의 pd.Series
+SIGNALS: Dict[str, Callable[[pd.DataFrame, Optional[pd.DataFrame]], pd.Series]] = {}
+# 모든 행에서 0보다 큰 값을 내는 신호. 이 신호에 가중치를 주면 score > 0 만으로는 걸러지지 않으므로
+# 예산(max_calls/max_tokens) 또는 min_score가 필요합니다.
+DENSE_SIGNALS = {"length", "type_fm_rate"}
+
+
+def register_signal(name: str):
+    """선택기 점수 신호를 등록하는 데코레이터"""
+    def decorator(fn):
+        SIGNALS[name] = fn
+        return fn
+    return decorator
+
+
+@register_signal("unchanged")
+def signal_unchanged(df: pd.DataFrame, history: Optional[pd.DataFrame]) -> pd.Series:
+    """모델이 교정하지 않은 문장 (기존 FM 후보 조건)"""
+    return (df['err_sentence'] == df['cor_sentence']).astype(float)
+
+
+@register_signal("suspicious")
+def signal_suspicious(df: pd.DataFrame, history: Optional[pd.DataFrame]) -> pd.Series:
+    """원문에 남아 있는 의심 패턴 수 (3개 이상이면 1.0)"""
+    return df['err_sentence'].str.count(SUSPICIOUS_REGEX).clip(upper=3) / 3
+
+
+@register_signal("length")
+def signal_length(df: pd.DataFrame, history: Optional[pd.DataFrame]) -> pd.Series:
+    """토큰 수 기준 백분위 (긴 문장일수록 놓친 오류가 많을 가능성)"""
+    return df['err_sentence'].str.split().str.len().rank(pct=True)
+
+
+@register_signal("type_fm_rate")
+def signal_type_fm_rate(df: pd.DataFrame, history: Optional[pd.DataFrame]) -> pd.Series:
+    """과거 analysis.csv 기준 오류 유형(type)별 FM 비율"""
+    if history is None or history.empty:
+        return pd.Series(0.0, index=df.index)
+
+    denom = history['tp'] + history['fp'] + history['fm']
+    global_rate = history['fm'].sum() / denom.sum() if denom.sum() > 0 else 0.0
+    if 'type' not in df.columns or 'type' not in history.columns:
+        return pd.Series(global_rate, index=df.index)
+
+    grouped = history.assign(denom=denom).groupby('type')[['fm', 'denom']].sum()
+    rate_by_type = (grouped['fm'] / grouped['denom'].where(grouped['denom'] > 0)).fillna(global_rate)
+    return df['type'].map(rate_by_type).fillna(global_rate).astype(float)
+
+
+def attach_types(df: pd.DataFrame, types_csv: str) -> pd.DataFrame:
+    """정답/테스트 CSV의 type을 id 기준으로 붙입니다 (제출 CSV에는 type 컬럼이 없음)."""
+    types = pd.read_csv(types_csv, dtype={'id': str})
+    if not {'id', 'type'}.issubset(types.columns):
+        raise ValueError(f"{types_csv} must contain 'id' and 'type' columns (found: {list(types.columns)})")
+    types = types.drop_duplicates('id', keep='last').set_index('id')['type']
+    df = df.drop(columns='type', errors='ignore')
+    df['type'] = df['id'].astype(str).map(types)
+    missing = df['type'].isna().sum()
+    if missing:
+        print(f"Warning: {missing} rows have no type in {types_csv} (type_fm_rate falls back to the global FM rate)")
+    return df
+
+
+def load_history(analysis_csvs: Sequence[str], truth_csv: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    과거 evaluate.py 결과(analysis.csv)들을 하나로 합칩니다.
+    analysis.csv에 type 컬럼이 없으면 truth_csv의 type을 행 순서 기준으로 붙입니다 (eda_failure_analysis.py와 동일한 방식).
     """
-    입력 CSV에서 err_sentence와 cor_sentence가 완벽히 일치하는 행만 추출하여 새로운 CSV로 저장합니다.
-    이 행들은 모델이 오류가 없다고 판단했지만, 실제로는 오류를 놓쳤을 수 있는 FM(False Negative) 후보군입니다.
+    if not analysis_csvs:
+        return None
+
+    truth_types = pd.read_csv(truth_csv)['type'] if truth_csv else None
+    frames = []
+    for path in analysis_csvs:
+        history = pd.read_csv(path)
+        if 'type' not in history.columns and truth_types is not None:
+            history['type'] = truth_types.values[:len(history)]
+        frames.append(history)
+    return pd.concat(frames, ignore_index=True)
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """'unchanged=1,suspicious=0.5' 형식의 가중치 문자열을 파싱합니다."""
+    weights = {}
+    for item in filter(None, (s.strip() for s in spec.split(','))):
+        name, _, value = item.partition('=')
+        if name not in SIGNALS:
+            raise ValueError(f"Unknown signal '{name}'. Available: {sorted(SIGNALS)}")
+        weights[name] = float(value) if value else 1.0
+    return weights
+
+
+def select_candidates(
+    df: pd.DataFrame,
+    weights: Dict[str, float],
+    history: Optional[pd.DataFrame] = None,
+    max_calls: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    calls_per_row: int = 1,
+    prompt_tokens: int = 600,
+    tokens_per_char: float = 1.0,
+    min_score: Optional[float] = None,
+) -> pd.DataFrame:
+    """
+    신호 가중합으로 행별 재시도 가치를 계산하고, 예산(API 호출 수/토큰 수) 안에서 가치가 높은 행을 고릅니다.
+    토큰 예산이 있으면 비용 대비 가치(score / est_tokens) 순으로 채웁니다.
+    min_score가 없으면 score > 0인 행이 후보이며, 모든 행이 양수인 신호(DENSE_SIGNALS)를 쓰려면 예산이나 min_score가 필요합니다.
+    """
+    dense = sorted(name for name, weight in weights.items() if weight > 0 and name in DENSE_SIGNALS)
+    if dense and max_calls is None and max_tokens is None and min_score is None:
+        raise ValueError(f"Signals {dense} are positive for every row; set max_calls, max_tokens or min_score "
+                         "to avoid selecting every row.")
+
+    scored = df.copy()
+    scored['score'] = 0.0
+    for name, weight in weights.items():
+        scored['score'] += weight * SIGNALS[name](scored, history)
+
+    # 재시도 비용 추정: 호출마다 (프롬프트 + 입력 + 같은 길이의 출력) 토큰
+    char_len = scored['err_sentence'].str.len()
+    scored['est_tokens'] = calls_per_row * (prompt_tokens + 2 * tokens_per_char * char_len)
+
+    scored = scored[scored['score'] > 0] if min_score is None else scored[scored['score'] >= min_score]
+    if max_tokens is not None:
+        scored = scored.assign(_density=scored['score'] / scored['est_tokens'])
+        scored = scored.sort_values('_density', ascending=False, kind='stable').drop(columns='_density')
+    else:
+        scored = scored.sort_values('score', ascending=False, kind='stable')
+
+    within_budget = pd.Series(True, index=scored.index)
+    if max_calls is not None:
+        within_budget &= (pd.Series(calls_per_row, index=scored.index).cumsum() <= max_calls)
+    if max_tokens is not None:
+        within_budget &= (scored['est_tokens'].cumsum() <= max_tokens)
+    return scored[within_budget]
+
+
+def filter_fm(input_csv: str, output_csv: str, weights: Optional[Dict[str, float]] = None, history: Optional[pd.DataFrame] = None,
+              types_csv: Optional[str] = None, **budget):
+    """
+    입력 CSV에서 재교정할 후보 행을 골라 새로운 CSV로 저장합니다.
+    기본값(unchanged 신호만, 예산 없음)은 err_sentence와 cor_sentence가 완벽히 일치하는 행, 즉
+    모델이 오류가 없다고 판단했지만 실제로는 오류를 놓쳤을 수 있는 FM(False Negative) 후보군을 모두 추출합니다.
     """
     print(f"Loading data from: {input_csv}")
-    
+
     # NaN 값을 처리하기 위해 dtype을 str로 명시적으로 설정하여 로드
     df = pd.read_csv(input_csv, dtype={'err_sentence': str, 'cor_sentence': str})
-    
+
     # 필수 컬럼 검사
     if not all(col in df.columns for col in ['id', 'err_sentence', 'cor_sentence']):
         raise ValueError("Input CSV must contain 'id', 'err_sentence', and 'cor_sentence' columns.")
 
     # 띄어쓰기나 미세한 공백 차이로 인해 불필요하게 필터링되지 않도록 양쪽 공백 제거
-    df['err_sentence'] = df['err_sentence'].str.strip()
-    df['cor_sentence'] = df['cor_sentence'].str.strip()
-    
-    # 두 컬럼의 내용이 완벽하게 일치하는 행을 필터링 (FM 후보군)
-    # 이 문장들은 V36 모델이 교정하지 않은 문장들입니다.
-    fm_candidates_df = df[df['err_sentence'] == df['cor_sentence']]
-    
-    # 재교정할 err_sentence와 id만 남김
-    fm_candidates_for_retry = fm_candidates_df[['id', 'err_sentence']].rename(columns={'err_sentence': 'text_to_retry'})
-    
+    df['err_sentence'] = df['err_sentence'].fillna('').str.strip()
+    df['cor_sentence'] = df['cor_sentence'].fillna('').str.strip()
+
+    # type_fm_rate 신호가 유형별로 달라지도록 type을 id 기준으로 붙임
+    if types_csv:
+        df = attach_types(df, types_csv)
+    elif (weights or {}).get('type_fm_rate') and 'type' not in df.columns:
+        print("Warning: input has no 'type' column; type_fm_rate uses the global FM rate for every row (pass --types).")
+
+    selected = select_candidates(df, weights or {"unchanged": 1.0}, history=history, **budget)
+
     # output CSV는 재교정 스크립트의 input 형식(id, err_sentence)과 맞춰야 합니다.
-    # 컬럼명을 원래대로 복원 (id, err_sentence)
-    fm_candidates_for_retry.rename(columns={'text_to_retry': 'err_sentence'}, inplace=True)
-    
+    fm_candidates_for_retry = selected[['id', 'err_sentence', 'score']]
+
     print(f"Total rows: {len(df)}")
     print(f"FM Candidates (rows to retry): {len(fm_candidates_for_retry)}")
+    if len(selected) > 0:
+        print(f"Estimated retry cost: {len(selected) * budget.get('calls_per_row', 1)} calls, ~{int(selected['est_tokens'].sum())} tokens")
 
     if len(fm_candidates_for_retry) > 0:
         # data 폴더에 저장
@@ -41,14 +196,40 @@ def filter_fm(input_csv: str, output_csv: str):
         print("Warning: No FM candidates found. All sentences were either corrected or identical.")
 
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Filter False Negative (FM) candidates for re-correction.")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Select False Negative (FM) candidates for re-correction within an API budget.")
     parser.add_argument("--input", default="final_2.csv", help="Path to the submission CSV to filter (e.g., final_2.csv)")
     parser.add_argument("--output", default="data/fm_candidates_to_retry.csv", help="Path to save the filtered FM candidates.")
-    args = parser.parse_args()
-    
+    parser.add_argument("--weights", default="unchanged=1", help=f"Comma-separated signal weights, e.g. 'unchanged=1,suspicious=0.5,length=0.2,type_fm_rate=1'. Available: {', '.join(SIGNALS)}")
+    parser.add_argument("--history", nargs="*", default=[], help="Past analysis.csv files used by the type_fm_rate signal.")
+    parser.add_argument("--history_truth", default=None, help="Truth CSV providing 'type' for history files that lack it (matched by row order).")
+    parser.add_argument("--types", default=None, help="Truth/test CSV with 'id' and 'type', joined onto the input by id for the type_fm_rate signal.")
+    parser.add_argument("--min_score", type=float, default=None, help="Minimum weighted score to select a row (default: score > 0).")
+    parser.add_argument("--max_calls", type=int, default=None, help="API call budget for the retry run.")
+    parser.add_argument("--max_tokens", type=int, default=None, help="Estimated token budget for the retry run.")
+    parser.add_argument("--calls_per_row", type=int, default=1, help="API calls per retried row (e.g., 2 for the 2-step XML retry).")
+    parser.add_argument("--prompt_tokens", type=int, default=600, help="Estimated prompt overhead tokens per call.")
+    parser.add_argument("--tokens_per_char", type=float, default=1.0, help="Estimated tokens per input character.")
+    args = parser.parse_args(argv)
+
     # data 폴더가 없다면 생성
-    import os
-    os.makedirs(os.path.dirname(args.output), exist_ok=True)
-    
-    filter_fm(args.input, args.output)
\ No newline at end of file
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+
+    filter_fm(
+        args.input,
+        args.output,
+        weights=parse_weights(args.weights),
+        history=load_history(args.history, args.history_truth),
+        types_csv=args.types,
+        max_calls=args.max_calls,
+        max_tokens=args.max_tokens,
+        calls_per_row=args.calls_per_row,
+        prompt_tokens=args.prompt_tokens,
+        tokens_per_char=args.tokens_per_char,
+        min_score=args.min_score,
+    )
+
+
+if __name__ == "__main__":
+    main()
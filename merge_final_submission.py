@@ -1,53 +1,102 @@
 import pandas as pd
 import argparse
 import os
+from typing import List, Sequence, Tuple, Union
 
-def merge_results(base_csv: str, correction_csv: str, output_csv: str):
+PRIORITIES = ("last", "first")
+
+
+def load_submission(path: str) -> pd.DataFrame:
+    """제출/교정 CSV를 로드하고 id를 문자열로 통일합니다."""
+    df = pd.read_csv(path, dtype={'err_sentence': str, 'cor_sentence': str})
+    if not all(col in df.columns for col in ['id', 'cor_sentence']):
+        raise ValueError(f"{path} must contain 'id' and 'cor_sentence' columns.")
+    df['id'] = df['id'].astype(str)
+    return df
+
+
+def merge_layers(base_df: pd.DataFrame, layers: Sequence[pd.DataFrame], priority: str = "last") -> Tuple[pd.DataFrame, List[int], int]:
     """
-    Merges re-corrected sentences from correction_csv into the base_csv.
-    Only rows present in correction_csv will have their cor_sentence overwritten in base_csv.
+    여러 교정 레이어(CoT 재시도, XML 재시도, 규칙 엔진 등)를 순서대로 base_df에 병합합니다.
+    모든 연산은 컬럼 단위(벡터화)로 수행되며, 레이어별로 덮어쓴 행 수와 한 번이라도 바뀐 전체 행 수를 반환합니다.
+    priority="last"에서는 여러 레이어가 같은 행을 덮어쓸 수 있으므로 레이어별 합계가 전체 행 수보다 클 수 있습니다.
+
+    - Precision-Guard: 레이어의 교정문이 err_sentence와 다를 때만 덮어씁니다.
+    - priority="last": 뒤쪽 레이어가 앞쪽 레이어의 교정을 덮어씁니다.
+    - priority="first": 앞쪽 레이어가 이미 교정한 행은 뒤쪽 레이어가 건드리지 않습니다.
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {PRIORITIES} (got: {priority!r})")
+
+    merged = base_df.copy()
+    err = merged['err_sentence'].fillna('').astype(str).str.strip()
+    cor = merged['cor_sentence']
+    # 이미 레이어에 의해 교정된 행 (priority="first"일 때 보호 대상)
+    claimed = pd.Series(False, index=merged.index)
+    updated_counts = []
+
+    for layer in layers:
+        # 같은 id가 여러 번 나오면 마지막 결과를 사용
+        layer_map = layer.drop_duplicates('id', keep='last').set_index('id')['cor_sentence']
+        new_cor = merged['id'].map(layer_map).str.strip()
+
+        # *핵심 로직*: 새로운 교정 내용이 원본 err_sentence와 다를 경우에만 덮어씁니다.
+        # 재시도가 또다시 오류를 찾지 못한 경우(FM-Retry-Failure) Precision을 낭비하지 않기 위함입니다.
+        mask = new_cor.notna() & (new_cor != '') & (new_cor != err)
+        if priority == "first":
+            mask &= ~claimed
+
+        cor = cor.mask(mask, new_cor)
+        claimed |= mask
+        updated_counts.append(int(mask.sum()))
+
+    merged['cor_sentence'] = cor
+    return merged, updated_counts, int(claimed.sum())
+
+
+def merge_results(base_csv: str, correction_csv: Union[str, Sequence[str]], output_csv: str, priority: str = "last"):
     """
+    Merges re-corrected sentences from one or more correction CSVs into the base_csv.
+    Correction layers are applied in the given order; see merge_layers for the overwrite policy.
+    """
+    correction_csvs = [correction_csv] if isinstance(correction_csv, str) else list(correction_csv)
+
     print(f"Loading base submission: {base_csv}")
-    base_df = pd.read_csv(base_csv)
-    
-    print(f"Loading re-corrected candidates: {correction_csv}")
-    correction_df = pd.read_csv(correction_csv)
-    
-    # Ensure 'id' column is the same type for merging/lookup
-    base_df['id'] = base_df['id'].astype(str)
-    correction_df['id'] = correction_df['id'].astype(str)
-    
-    # Create a mapping dictionary: {id: new_cor_sentence}
-    new_corrections_map = correction_df.set_index('id')['cor_sentence'].to_dict()
-    
-    # Apply the new corrections to the base dataframe
-    updated_count = 0
-    
-    for index, row in base_df.iterrows():
-        if row['id'] in new_corrections_map:
-            new_cor = new_corrections_map[row['id']].strip()
-            
-            # *핵심 로직*: 새로운 교정 내용이 원본 err_sentence와 다를 경우에만 덮어씁니다.
-            # 이는 CoT 재시도가 또다시 오류를 찾지 못한 경우(FM-Retry-Failure) Precision을 낭비하지 않기 위함입니다.
-            if new_cor != row['err_sentence'].strip():
-                base_df.loc[index, 'cor_sentence'] = new_cor
-                updated_count += 1
-            # 만약 new_cor == err_sentence라면, CoT도 오류를 못 찾았다는 뜻이므로 원본 cor_sentence(err_sentence와 같음)를 유지합니다.
-
-    print(f"Total rows updated with new correction (Recall Boosted): {updated_count}")
-    
+    base_df = load_submission(base_csv)
+    if 'err_sentence' not in base_df.columns:
+        raise ValueError("Base CSV must contain 'err_sentence' column for the precision guard.")
+
+    layers = []
+    for path in correction_csvs:
+        print(f"Loading re-corrected candidates: {path}")
+        layers.append(load_submission(path))
+
+    merged_df, updated_counts, total_updated = merge_layers(base_df, layers, priority=priority)
+
+    for path, count in zip(correction_csvs, updated_counts):
+        print(f"  - {path}: {count} rows written by this layer")
+    print(f"Total rows updated with new correction (Recall Boosted): {total_updated} (priority={priority})")
+
     # Save the final merged dataframe
-    os.makedirs(os.path.dirname(output_csv), exist_ok=True)
-    base_df.to_csv(output_csv, index=False)
-    
+    output_dir = os.path.dirname(output_csv)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    merged_df.to_csv(output_csv, index=False)
+
     print(f"✅ Final merged submission saved to: {output_csv}")
+    return updated_counts
 
 
-if __name__ == "__main__":
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Merge re-corrected FM candidates into the base submission file.")
     parser.add_argument("--base", default="final_2.csv", help="Path to the base submission CSV (e.g., final_2.csv).")
-    parser.add_argument("--correction", default="data/fm_recorrected.csv", help="Path to the CSV with re-corrected sentences.")
+    parser.add_argument("--correction", nargs="+", default=["data/fm_recorrected.csv"], help="One or more correction CSVs, applied in the given order (e.g., CoT retry, XML retry, rule engine).")
+    parser.add_argument("--priority", choices=PRIORITIES, default="last", help="'last': later layers override earlier ones. 'first': the first layer that changes a row wins.")
     parser.add_argument("--output", default="submission/final_submission_fm_boosted.csv", help="Path to save the final merged submission.")
-    args = parser.parse_args()
-    
-    merge_results(args.base, args.correction, args.output)
\ No newline at end of file
+    args = parser.parse_args(argv)
+
+    merge_results(args.base, args.correction, args.output, priority=args.priority)
+
+
+if __name__ == "__main__":
+    main()
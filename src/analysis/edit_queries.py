@@ -0,0 +1,92 @@
+import argparse
+import pandas as pd
+
+# 자주 쓰이는 조사 (긴 것부터 매칭되도록 정렬)
+PARTICLES = [
+    '에서', '에게', '한테', '으로', '까지', '부터', '보다', '처럼', '하고', '이나', '이랑', '마저', '조차',
+    '은', '는', '이', '가', '을', '를', '에', '의', '로', '와', '과', '도', '만', '나', '랑',
+]
+# 마지막 어절 끝의 조사 (뒤따르는 문장 부호는 무시)
+PARTICLE_REGEX = r'(' + '|'.join(PARTICLES) + r')[^\w\s]*$'
+
+
+def load_edits(path: str) -> pd.DataFrame:
+    """evaluate.py --edits_output으로 저장한 편집 단위 인덱스(Parquet)를 로드합니다."""
+    return pd.read_parquet(path)
+
+
+def top_missed_rewrites(edits: pd.DataFrame, n: int = 20) -> pd.DataFrame:
+    """가장 자주 놓친(FM) 원문 → 정답 구간 교정"""
+    missed = edits[edits['outcome'] == 'FM']
+    return (
+        missed.groupby(['original_span', 'golden_span'], dropna=False)
+        .agg(count=('id', 'size'), sentences=('id', 'nunique'), types=('type', lambda s: s.value_counts().head(3).to_dict()))
+        .sort_values('count', ascending=False)
+        .head(n)
+        .reset_index()
+    )
+
+
+def top_wrong_rewrites(edits: pd.DataFrame, n: int = 20) -> pd.DataFrame:
+    """가장 자주 틀리게 고친(FP) 원문 → 예측 구간 (정답과 함께)"""
+    wrong = edits[edits['outcome'] == 'FP']
+    return (
+        wrong.groupby(['original_span', 'predicted_span', 'golden_span'], dropna=False)
+        .size()
+        .rename('count')
+        .sort_values(ascending=False)
+        .head(n)
+        .reset_index()
+    )
+
+
+def fr_by_particle(edits: pd.DataFrame) -> pd.DataFrame:
+    """불필요한 수정(FR)을 원문 조사 → 예측 조사 쌍으로 집계"""
+    redundant = edits[edits['outcome'] == 'FR']
+    particles = pd.DataFrame({
+        'original_particle': redundant['original_span'].fillna('').str.extract(PARTICLE_REGEX, expand=False),
+        'predicted_particle': redundant['predicted_span'].fillna('').str.extract(PARTICLE_REGEX, expand=False),
+    })
+    return (
+        particles.fillna('-')
+        .value_counts()
+        .rename('count')
+        .reset_index()
+    )
+
+
+def outcome_by_type(edits: pd.DataFrame) -> pd.DataFrame:
+    """오류 유형(type)별 TP/FP/FM/FR 편집 수"""
+    table = pd.crosstab(edits['type'].fillna('-'), edits['outcome'])
+    return table.reindex(columns=['TP', 'FP', 'FM', 'FR'], fill_value=0).sort_values('FM', ascending=False)
+
+
+QUERIES = {
+    "missed": top_missed_rewrites,
+    "wrong": top_wrong_rewrites,
+    "fr_particle": fr_by_particle,
+    "type": outcome_by_type,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grouped queries over the edit-level index written by evaluate.py --edits_output")
+    parser.add_argument("--edits", default="edits.parquet", help="Path to the edit-level Parquet file")
+    parser.add_argument("--query", choices=QUERIES, default="missed", help="missed: top FM rewrites, wrong: top FP rewrites, fr_particle: FR by particle, type: outcomes by type")
+    parser.add_argument("--top", type=int, default=20, help="Number of rows to show")
+    parser.add_argument("--output", default=None, help="Path to save the query result as CSV (optional)")
+    args = parser.parse_args(argv)
+
+    edits = load_edits(args.edits)
+    query = QUERIES[args.query]
+    result = query(edits, args.top) if args.query in ("missed", "wrong") else query(edits).head(args.top)
+
+    with pd.option_context('display.max_colwidth', 60, 'display.width', 200):
+        print(result.to_string())
+    if args.output:
+        result.to_csv(args.output)
+        print(f"Query result saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import json
+import re
+import zlib
+import numpy as np
+import pandas as pd
+
+from src.analysis.edit_queries import load_edits
+
+# MinHash 해시 함수 h(x) = (a·x + b) mod p (32비트 shingle 해시 x에 대해 uint64 안에서 계산되도록 p < 2^32)
+PRIME = np.uint64(4294967291)
+ARROW = '→'
+
+
+def edit_signature(original, golden) -> str:
+    """원문 구간 → 정답 구간을 정규화한 편집 시그니처 (공백 연속은 하나로, 띄어쓰기 자체는 유지)"""
+    original = re.sub(r'\s+', ' ', '' if pd.isna(original) else str(original)).strip()
+    golden = re.sub(r'\s+', ' ', '' if pd.isna(golden) else str(golden)).strip()
+    return f'{original}{ARROW}{golden}'
+
+
+def shingles(signature: str, n: int = 3) -> set:
+    """문자 n-gram 집합 (양 끝 표시 포함, 짧은 시그니처도 최소 한 개)"""
+    padded = f'^{signature}$'
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+def minhash_signatures(signatures, n: int = 3, num_perm: int = 128, seed: int = 42, block: int = 16) -> np.ndarray:
+    """(num_perm, 시그니처 수) MinHash 행렬. 모든 shingle을 평탄화해 permutation 블록 단위로 벡터 계산합니다."""
+    hashes, owners = [], []
+    for i, signature in enumerate(signatures):
+        for shingle in shingles(signature, n):
+            hashes.append(zlib.crc32(shingle.encode('utf-8')))
+            owners.append(i)
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    owners = np.asarray(owners, dtype=np.int64)
+    # reduceat은 같은 owner가 연속해 있어야 하므로 시작 위치를 구함 (위 루프에서 이미 owner 순서)
+    starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, int(PRIME), size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, int(PRIME), size=num_perm, dtype=np.uint64)
+    result = np.empty((num_perm, len(signatures)), dtype=np.uint64)
+    for lo in range(0, num_perm, block):
+        hi = min(lo + block, num_perm)
+        permuted = (a[lo:hi, None] * hashes[None, :] % PRIME + b[lo:hi, None]) % PRIME
+        result[lo:hi] = np.minimum.reduceat(permuted, starts, axis=1)
+    return result
+
+
+def lsh_clusters(minhashes: np.ndarray, bands: int = 32, threshold: float = 0.5) -> np.ndarray:
+    """
+    LSH 밴딩으로 후보 쌍을 찾고, 추정 Jaccard가 threshold 이상인 쌍만 union-find로 합칩니다.
+    같은 버킷의 항목은 버킷의 첫 항목과만 비교하므로 전체 비교 없이 거의 선형 시간입니다.
+    반환값은 항목별 클러스터 대표 인덱스입니다.
+    """
+    num_perm, n = minhashes.shape
+    rows = num_perm // bands
+    parent = np.arange(n)
+
+    def find(x: int) -> int:
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    for band in range(bands):
+        keys = np.ascontiguousarray(minhashes[band * rows:(band + 1) * rows].T)
+        _, first, inverse = np.unique(keys.view(np.dtype((np.void, keys.dtype.itemsize * rows))).ravel(),
+                                      return_index=True, return_inverse=True)
+        representatives = first[inverse]
+        candidates = np.flatnonzero(representatives != np.arange(n))
+        if len(candidates) == 0:
+            continue
+        similarity = (minhashes[:, candidates] == minhashes[:, representatives[candidates]]).mean(axis=0)
+        for item, rep in zip(candidates[similarity >= threshold], representatives[candidates][similarity >= threshold]):
+            root_item, root_rep = find(int(item)), find(int(rep))
+            if root_item != root_rep:
+                parent[max(root_item, root_rep)] = min(root_item, root_rep)
+
+    return np.array([find(i) for i in range(n)])
+
+
+def cluster_failures(edits: pd.DataFrame, outcomes=('FM', 'FP'), n: int = 3, num_perm: int = 128, bands: int = 32,
+                     threshold: float = 0.5, examples: int = 5) -> pd.DataFrame:
+    """FM/FP 편집을 시그니처로 묶어 편집 수 순으로 정렬한 클러스터 표"""
+    columns = ['cluster', 'edits', 'sentences', 'signatures', 'outcomes', 'types', 'examples']
+    failures = edits[edits['outcome'].isin(outcomes)].copy()
+    if failures.empty:
+        return pd.DataFrame(columns=columns)
+    failures['signature'] = [edit_signature(o, g) for o, g in zip(failures['original_span'], failures['golden_span'])]
+
+    # 같은 시그니처는 한 번만 해싱하고 편집 수를 가중치로 사용
+    unique = failures['signature'].value_counts()
+    minhashes = minhash_signatures(unique.index.tolist(), n=n, num_perm=num_perm)
+    roots = lsh_clusters(minhashes, bands=bands, threshold=threshold)
+    failures['cluster_root'] = failures['signature'].map(dict(zip(unique.index, roots)))
+
+    records = []
+    for _, group in failures.groupby('cluster_root'):
+        top = group['signature'].value_counts()
+        records.append({
+            'edits': len(group),
+            'sentences': group['id'].nunique(),
+            'signatures': len(top),
+            'outcomes': group['outcome'].value_counts().to_dict(),
+            'types': group['type'].fillna('-').value_counts().head(3).to_dict(),
+            'examples': [
+                {'signature': signature, 'count': int(count), 'ids': group.loc[group['signature'] == signature, 'id'].astype(str).head(3).tolist()}
+                for signature, count in top.head(examples).items()
+            ],
+        })
+    clusters = pd.DataFrame(records).sort_values(['edits', 'sentences'], ascending=False, kind='stable').reset_index(drop=True)
+    clusters.insert(0, 'cluster', np.arange(1, len(clusters) + 1))
+    return clusters
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cluster FM/FP edits by MinHash/LSH over character n-gram signatures of original→golden spans")
+    parser.add_argument("--edits", default="edits.parquet", help="Path to the edit-level Parquet file written by evaluate.py --edits_output")
+    parser.add_argument("--outcomes", nargs="+", default=["FM", "FP"], choices=["TP", "FP", "FM", "FR"], help="Edit outcomes to cluster")
+    parser.add_argument("--ngram", type=int, default=3, help="Character n-gram size of the signature shingles")
+    parser.add_argument("--num_perm", type=int, default=128, help="MinHash permutations")
+    parser.add_argument("--bands", type=int, default=32, help="LSH bands (num_perm must be divisible by bands)")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Minimum estimated Jaccard similarity to join a cluster")
+    parser.add_argument("--top", type=int, default=20, help="Number of clusters to show")
+    parser.add_argument("--output", default=None, help="Path to save all clusters as JSON lines for few-shot example selection (optional)")
+    args = parser.parse_args(argv)
+
+    if args.num_perm % args.bands:
+        raise ValueError(f"--num_perm ({args.num_perm}) must be divisible by --bands ({args.bands})")
+
+    edits = load_edits(args.edits)
+    clusters = cluster_failures(edits, outcomes=args.outcomes, n=args.ngram, num_perm=args.num_perm,
+                                bands=args.bands, threshold=args.threshold)
+    print(f"{clusters['edits'].sum()} {'/'.join(args.outcomes)} edits -> {len(clusters)} clusters\n")
+
+    for _, row in clusters.head(args.top).iterrows():
+        print(f"[{row['cluster']}] edits={row['edits']} sentences={row['sentences']} outcomes={row['outcomes']} types={row['types']}")
+        for example in row['examples']:
+            print(f"    {example['count']:>4} × {example['signature']}  (id {', '.join(example['ids'])})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for record in clusters.to_dict(orient='records'):
+                f.write(json.dumps(record, ensure_ascii=False, default=int) + '\n')
+        print(f"\nClusters saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
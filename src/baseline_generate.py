@@ -6,16 +6,49 @@ from tqdm import tqdm
 from dotenv import load_dotenv
 from openai import OpenAI
 from src.prompts import baseline_prompt
+from src import chunking, hedging, telemetry
 
 # Load environment variables
 load_dotenv()
 
-def main():
+SYSTEM_MESSAGE = "당신은 한국어 문장 교정 전문가입니다. 맞춤법/띄어쓰기/문장부호/문법을 자연스럽게 교정하세요. 반드시 불필요한 설명 없이 교정된 문장만 출력하세요."
+
+
+def baseline_correction(client: OpenAI, model: str, text: str) -> str:
+    """Baseline 프롬프트로 한 문장을 교정합니다. 실패 시 원문을 반환합니다."""
+    try:
+        prompt = baseline_prompt.format(text=text)
+        resp = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SYSTEM_MESSAGE},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.0,
+        )
+        return resp.choices[0].message.content.strip()
+        
+    except Exception as e:
+        print(f"Error processing: {text[:50]}... - {e}")
+        telemetry.record_event("fallback_to_original")
+        return text  # fallback to original
+
+
+def max_text_tokens() -> int:
+    """Baseline 요청(프롬프트 + 입력 문장 + 같은 길이의 교정문)이 TOKEN_LIMIT 안에 들어가는 입력 문장 토큰 수"""
+    return chunking.text_token_budget([SYSTEM_MESSAGE, baseline_prompt.format(text="")], copies=2)
+
+
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Generate corrected sentences using Upstage API")
     parser.add_argument("--input", default="data/train_dataset.csv", help="Input CSV path containing err_sentence column")
     parser.add_argument("--output", default="submission.csv", help="Output CSV path")
     parser.add_argument("--model", default="solar-pro2", help="Model name (default: solar-pro2)")
-    args = parser.parse_args()
+    parser.add_argument("--telemetry_dir", default=None, help="Directory for the run summary JSON and OpenMetrics file (optional)")
+    hedging.add_hedge_arguments(parser)
+    telemetry.add_price_arguments(parser)
+    chunking.add_chunk_arguments(parser)
+    args = parser.parse_args(argv)
 
     # Load data
     df = pd.read_csv(args.input)
@@ -28,10 +61,14 @@ def main():
     if not api_key:
         raise ValueError("UPSTAGE_API_KEY not found in environment variables")
     
-    client = OpenAI(api_key=api_key, base_url="https://api.upstage.ai/v1")
+    tel = telemetry.start("baseline_generate", prices=telemetry.prices_from_args(args))
+    client = tel.instrument(OpenAI(api_key=api_key, base_url="https://api.upstage.ai/v1"))
+    hedger = hedging.from_args(args, client, tel)
     
     print(f"Model: {args.model}")
     print(f"Output: {args.output}")
+    max_chunk_tokens = args.max_chunk_tokens or max_text_tokens()
+    print(f"긴 입력은 문장 경계에서 {max_chunk_tokens} 토큰 이하 조각으로 나눠 교정합니다.")
 
     err_sentences = []
     cor_sentences = []
@@ -39,28 +76,18 @@ def main():
     # Process each sentence
     for text in tqdm(df["err_sentence"].astype(str).tolist(), desc="Generating"):
         err_sentences.append(text)
-        
-        try:
-            prompt = baseline_prompt.format(text=text)
-            resp = client.chat.completions.create(
-                model=args.model,
-                messages=[
-                    {"role": "system", "content": "당신은 한국어 문장 교정 전문가입니다. 맞춤법/띄어쓰기/문장부호/문법을 자연스럽게 교정하세요. 반드시 불필요한 설명 없이 교정된 문장만 출력하세요."},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.0,
-            )
-            corrected = resp.choices[0].message.content.strip()
-            cor_sentences.append(corrected)
-            
-        except Exception as e:
-            print(f"Error processing: {text[:50]}... - {e}")
-            cor_sentences.append(text)  # fallback to original
+        cor_sentences.append(chunking.correct_chunked(
+            lambda chunk: baseline_correction(client, args.model, chunk),
+            text, max_chunk_tokens, chunking.count_text_tokens, max_workers=args.chunk_workers,
+        ))
 
     # Save results with required column names
     out_df = pd.DataFrame({"err_sentence": err_sentences, "cor_sentence": cor_sentences})
     out_df.to_csv(args.output, index=False)
     print(f"Wrote {len(out_df)} rows to {args.output}")
+    if hedger is not None:
+        hedger.finish()
+    tel.finish(args.telemetry_dir)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+"""
+토큰 예산을 넘는 긴 입력을 문장 경계에서 나눠 동시에 교정하고, 원문의 공백을 그대로 살려 다시 합칩니다.
+
+    corrected = chunking.correct_chunked(correct, text, max_tokens=400, count_tokens=chunking.count_text_tokens)
+
+생성 스크립트는 add_chunk_arguments로 --max_chunk_tokens / --chunk_workers를 받고, 기본 예산은
+text_token_budget(프롬프트, 문장이 요청에 들어가는 횟수)로 TOKEN_LIMIT에서 계산합니다.
+합친 결과는 원문 전체에 대한 교정문이므로 그대로 metrics.find_differences_with_offsets(원문, 결과)로 채점합니다.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Sequence, Tuple
+
+from src import telemetry
+
+TOKEN_LIMIT = 2000
+
+# 문장 끝: 종결 부호(+ 닫는 따옴표/괄호) 뒤에 공백이 오는 위치, 또는 줄바꿈
+SENTENCE_END = re.compile(r'[.!?…]+["\'”’)\]]*(?=\s)|\n')
+WORD = re.compile(r'\S+\s*')
+
+
+class Chunk(NamedTuple):
+    start: int  # 원문 문자 오프셋 [start, end)
+    end: int
+
+
+@lru_cache(maxsize=1)
+def get_encoder():
+    """토큰 계산기 (GPT-4용이지만 Solar Pro 2의 토큰 근사치 계산에 활용). 처음 필요할 때 한 번만 로드합니다."""
+    import tiktoken
+
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_text_tokens(text: str) -> int:
+    return len(get_encoder().encode(text))
+
+
+def text_token_budget(prompts: Sequence[str], copies: int, reserved: int = 0, limit: int = TOKEN_LIMIT, margin: int = 200) -> int:
+    """
+    한 요청이 limit 안에 들어가는 입력 문장 토큰 수.
+    prompts(시스템 메시지, 문장을 뺀 프롬프트)와 reserved(예: 이전 단계 출력)를 뺀 나머지를 문장이 요청에 들어가는 횟수(copies)로 나눕니다.
+    """
+    overhead = sum(count_text_tokens(p) + 4 for p in prompts) + 2 + reserved
+    return max(64, (limit - overhead - margin) // copies)
+
+
+def split_sentences(text: str) -> List[Tuple[int, int]]:
+    """원문 전체를 빈틈없이 덮는 문장 구간 목록. 공백만 있는 구간은 다음 문장에 붙입니다."""
+    spans = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        if text[start:match.end()].strip():
+            spans.append((start, match.end()))
+            start = match.end()
+    if start < len(text):
+        if text[start:].strip() or not spans:
+            spans.append((start, len(text)))
+        else:
+            spans[-1] = (spans[-1][0], len(text))
+    return spans
+
+
+def _split_words(text: str, start: int, end: int, max_tokens: int, count_tokens: Callable[[str], int]) -> List[Tuple[int, int]]:
+    """예산보다 긴 한 문장을 어절(공백) 경계에서 나눕니다."""
+    spans = []
+    piece_start, piece_tokens = start, 0
+    for match in WORD.finditer(text, start, end):
+        tokens = count_tokens(match.group())
+        if piece_tokens and piece_tokens + tokens > max_tokens:
+            spans.append((piece_start, match.start()))
+            piece_start, piece_tokens = match.start(), 0
+        piece_tokens += tokens
+    spans.append((piece_start, end))
+    return spans
+
+
+def chunk_text(text: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[Chunk]:
+    """문장 단위로 max_tokens 이하가 되도록 묶은 조각 목록 (원문을 빈틈없이 덮음)"""
+    pieces = []
+    for start, end in split_sentences(text):
+        tokens = count_tokens(text[start:end])
+        if tokens > max_tokens:
+            pieces.extend((s, e, count_tokens(text[s:e])) for s, e in _split_words(text, start, end, max_tokens, count_tokens))
+        else:
+            pieces.append((start, end, tokens))
+
+    spans = []
+    for start, end, tokens in pieces:
+        if spans and spans[-1][2] + tokens <= max_tokens:
+            spans[-1] = (spans[-1][0], end, spans[-1][2] + tokens)
+        else:
+            spans.append((start, end, tokens))
+
+    return [Chunk(start, end) for start, end, _ in spans]
+
+
+def _surrounding_whitespace(piece: str) -> Tuple[str, str, str]:
+    core = piece.strip()
+    if not core:
+        return piece, "", ""
+    lead = piece[:len(piece) - len(piece.lstrip())]
+    trail = piece[len(piece.rstrip()):]
+    return lead, core, trail
+
+
+def chunk_inputs(text: str, chunks: List[Chunk]) -> List[str]:
+    """모델에 보낼 조각 본문 (앞뒤 공백 제외)"""
+    return [_surrounding_whitespace(text[c.start:c.end])[1] for c in chunks]
+
+
+def reassemble(text: str, chunks: List[Chunk], corrected: List[str]) -> str:
+    """교정된 조각을 원문의 조각 사이 공백/줄바꿈을 그대로 살려 합칩니다. 빈 출력은 원문 조각으로 대체합니다."""
+    parts = []
+    for chunk, output in zip(chunks, corrected):
+        lead, core, trail = _surrounding_whitespace(text[chunk.start:chunk.end])
+        output = (output or "").strip()
+        parts.append(lead + (output if output else core) + trail)
+    return "".join(parts)
+
+
+def correct_chunked(correct: Callable[[str], str], text: str, max_tokens: int, count_tokens: Callable[[str], int],
+                    max_workers: int = 4) -> str:
+    """예산 안이면 그대로 correct(text), 넘으면 문장 경계 조각들을 동시에 교정해 다시 합칩니다."""
+    if count_tokens(text) <= max_tokens:
+        return correct(text)
+
+    chunks = chunk_text(text, max_tokens, count_tokens)
+    telemetry.record_event("chunked_input")
+    telemetry.record_event("chunks", len(chunks))
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        corrected = list(pool.map(correct, chunk_inputs(text, chunks)))
+    return reassemble(text, chunks, corrected)
+
+
+def add_chunk_arguments(parser):
+    """생성 스크립트 공통 긴 입력 분할 옵션"""
+    parser.add_argument("--max_chunk_tokens", type=int, default=None, help="Split longer inputs at sentence boundaries into chunks of at most this many tokens (default: derived from TOKEN_LIMIT)")
+    parser.add_argument("--chunk_workers", type=int, default=4, help="Chunks of one long input corrected concurrently")
@@ -0,0 +1,302 @@
+"""
+정답 데이터를 한 번만 로드해 두고 예측을 밀리초 단위로 채점하는 로컬 평가 데몬.
+
+    python cli.py eval-daemon serve --true_df data/train_dataset.csv      # 한 번 띄워 두기
+    python cli.py eval-daemon score --pred_df submission.csv              # 매 실험마다
+    python cli.py eval-daemon stop
+
+서버는 원문 토큰과 정답 차이점(golden diff)을 메모리에 유지하므로, 요청마다 예측 쪽 차이점만 계산합니다.
+채점 결과는 metrics.evaluate_correction과 같습니다. score 클라이언트는 표준 라이브러리만 사용하므로
+pandas import 없이 바로 응답을 받습니다.
+
+인증이 없으므로 루프백 주소에만 바인딩하고, 클라이언트가 요청한 analysis CSV는 --output_dir 아래에만 씁니다.
+"""
+import argparse
+import ipaddress
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def is_loopback(host: str) -> bool:
+    """host가 루프백 주소로만 해석되는지 (인증이 없으므로 외부 인터페이스에는 바인딩하지 않음)"""
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except socket.gaierror:
+        return False
+    return bool(addresses) and all(ipaddress.ip_address(a.split("%")[0]).is_loopback for a in addresses)
+
+
+class TruthSet:
+    """정답 CSV와 미리 계산한 원문 토큰 / 정답 차이점"""
+
+    def __init__(self, path: str):
+        from src import metrics
+        from src.truth_store import META_FILE, open_truth
+
+        self.path = os.path.abspath(path)
+        # 컴파일된 truth store 디렉터리이면 meta.json(마지막에 기록됨)의 수정 시각으로 변경을 감지
+        self.mtime_path = os.path.join(self.path, META_FILE) if os.path.isdir(self.path) else self.path
+        self.mtime = os.path.getmtime(self.mtime_path)
+        # store에서는 id/type/target part만 DataFrame으로 디코딩
+        true_df, store = open_truth(self.path, columns=["id", "type", "original_target_part", "golden_target_part"])
+        self._store = store
+        columns = store.columns if store is not None else list(true_df.columns)
+        if not {"err_sentence", "cor_sentence"}.issubset(columns):
+            raise ValueError(f"Truth DF must have columns 'err_sentence' and 'cor_sentence' (found: {columns})")
+
+        if store is not None:
+            # 문장 컬럼은 메모리 매핑된 store에서 필요한 행만 디코딩
+            self.err_sentences = store.column("err_sentence")
+            self.cor_sentences = store.column("cor_sentence")
+            self.err_sentences_str = store.column("err_sentence", na_value="nan")
+        else:
+            self.err_sentences = true_df["err_sentence"].tolist()
+            self.cor_sentences = true_df["cor_sentence"].tolist()
+            self.err_sentences_str = [str(s) for s in self.err_sentences]
+        self.types = true_df["type"].tolist() if "type" in true_df.columns else None
+        # evaluate.py 편집 인덱스와 같은 규칙: id 컬럼이 없으면 1부터 시작하는 행 번호
+        self.ids = true_df["id"].astype(str).tolist() if "id" in true_df.columns else [str(i + 1) for i in range(len(true_df))]
+        self.target_parts = None
+        if "original_target_part" in true_df.columns and "golden_target_part" in true_df.columns:
+            self.target_parts = true_df[["original_target_part", "golden_target_part"]].reset_index(drop=True)
+        if store is not None:
+            # 메모리 매핑된 배열에서 필요한 행만 읽음
+            self.original_tokens = store.original_tokens
+            self.golden_differences = store.golden_differences
+        else:
+            self.original_tokens = [metrics.tokenize(s) for s in self.err_sentences]
+            self.golden_differences = [
+                metrics.find_differences_with_offsets(o, g) for o, g in zip(self.err_sentences, self.cor_sentences)
+            ]
+
+    def __len__(self):
+        return len(self.err_sentences)
+
+    def _same_err_sentences(self, values: List[str]) -> bool:
+        if self._store is not None:
+            return self.err_sentences_str.equals(values)
+        return values == self.err_sentences_str
+
+    def score_row(self, i: int, prediction: str) -> Tuple[int, int, int, int]:
+        """i번째 행의 (tp, fp, fm, fr)"""
+        from src import metrics
+
+        differences_op = metrics.merge_close_differences(metrics.diff_tokens(self.original_tokens[i], metrics.tokenize(prediction)))
+        return metrics.count_outcomes(metrics.match_differences(self.golden_differences[i], differences_op))
+
+    def score(self, predictions: List[str], err_sentences: Optional[List[str]] = None, include_rows: bool = False) -> Dict:
+        """evaluate.evaluate와 같은 검증 후 채점합니다. include_rows=True이면 행별 tp/fp/fm/fr도 반환합니다."""
+        # Competition-style strictness: require same length and (if provided) same err_sentence order
+        if len(predictions) != len(self):
+            raise ValueError(f"Length mismatch: truth={len(self)} vs pred={len(predictions)}. Ensure one-to-one rows.")
+        if err_sentences is not None and not self._same_err_sentences([str(s) for s in err_sentences]):
+            raise ValueError("Row order/content mismatch in 'err_sentence' between truth and submission.")
+
+        totals = [0, 0, 0, 0]
+        rows = []
+        for i, prediction in enumerate(predictions):
+            counts = self.score_row(i, prediction)
+            totals = [t + c for t, c in zip(totals, counts)]
+            if include_rows:
+                rows.append(dict(zip(("tp", "fp", "fm", "fr"), counts)))
+
+        tp, fp, fm, fr = totals
+        result = {
+            "recall": tp / (tp + fp + fm) * 100 if (tp + fp + fm) > 0 else 0.0,
+            "precision": tp / (tp + fp + fr) * 100 if (tp + fp + fr) > 0 else 0.0,
+            "true_positives": tp,
+            "false_positives": fp,
+            "false_missings": fm,
+            "false_redundants": fr,
+        }
+        if include_rows:
+            result["rows"] = rows
+        return result
+
+
+class EvalServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, truth_path: str, output_dir: str = "."):
+        if not is_loopback(address[0]):
+            raise ValueError(f"Refusing to bind to non-loopback host '{address[0]}': the daemon has no authentication.")
+        super().__init__(address, EvalHandler)
+        self.truth_path = truth_path
+        self.output_dir = os.path.realpath(output_dir)
+        self.truth_lock = threading.Lock()
+        self.truth = TruthSet(truth_path)
+
+    def get_truth(self) -> TruthSet:
+        """정답 파일이 바뀌었으면 다시 로드합니다."""
+        with self.truth_lock:
+            if os.path.getmtime(self.truth.mtime_path) != self.truth.mtime:
+                print(f"Truth file changed, reloading {self.truth.path}")
+                self.truth = TruthSet(self.truth_path)
+            return self.truth
+
+    def resolve_output(self, path: str) -> str:
+        """analysis CSV 출력 경로는 output_dir 아래의 .csv 파일로만 허용합니다."""
+        resolved = os.path.realpath(os.path.join(self.output_dir, path))
+        if os.path.commonpath([resolved, self.output_dir]) != self.output_dir or not resolved.endswith(".csv"):
+            raise ValueError(f"output must be a .csv path inside {self.output_dir} (got {path})")
+        return resolved
+
+
+class EvalHandler(BaseHTTPRequestHandler):
+    server: EvalServer
+
+    def _send(self, status: int, payload: Dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/health":
+            truth = self.server.get_truth()
+            self._send(200, {"truth": truth.path, "rows": len(truth)})
+        else:
+            self._send(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path == "/shutdown":
+            self._send(200, {"status": "shutting down"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        if self.path != "/score":
+            self._send(404, {"error": f"unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("Request body must be a JSON object")
+            started = time.perf_counter()
+            result = self._score(request)
+            result["elapsed_ms"] = (time.perf_counter() - started) * 1000
+            self._send(200, result)
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            # 잘못된 요청(형식 오류, 없는 경로, 디렉터리 경로 등)은 연결을 끊지 않고 400으로 응답
+            self._send(400, {"error": f"{type(e).__name__}: {e}"})
+
+    def _score(self, request: Dict) -> Dict:
+        truth = self.server.get_truth()
+        output = self.server.resolve_output(request["output"]) if request.get("output") else None
+
+        if "pred_path" in request:
+            import pandas as pd
+
+            pred_df = pd.read_csv(request["pred_path"])
+            if "cor_sentence" not in pred_df.columns:
+                raise ValueError(f"Prediction DF must have column 'cor_sentence' (found: {list(pred_df.columns)})")
+            predictions = pred_df["cor_sentence"].astype(str).tolist()
+            err_sentences = pred_df["err_sentence"].tolist() if "err_sentence" in pred_df.columns else None
+        else:
+            predictions = request["predictions"]
+            err_sentences = request.get("err_sentences")
+            if not _is_str_list(predictions):
+                raise ValueError("'predictions' must be a list of strings")
+            if err_sentences is not None and not _is_str_list(err_sentences):
+                raise ValueError("'err_sentences' must be a list of strings")
+
+        result = truth.score(predictions, err_sentences, include_rows=bool(output) or request.get("include_rows", False))
+
+        # evaluate.py --output과 같은 analysis CSV
+        if output:
+            import pandas as pd
+
+            analysis_df = pd.DataFrame({"original": list(truth.err_sentences), "golden": list(truth.cor_sentences), "prediction": predictions})
+            analysis_df = pd.concat([analysis_df, pd.DataFrame(result["rows"])], axis=1)
+            if truth.target_parts is not None:
+                analysis_df = pd.concat([analysis_df, truth.target_parts], axis=1)
+            analysis_df.to_csv(output, index=False)
+            result["output"] = output
+            if not request.get("include_rows", False):
+                result.pop("rows")
+        return result
+
+
+def _is_str_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def request_json(url: str, path: str, payload: Optional[Dict] = None, timeout: float = 60) -> Dict:
+    data = json.dumps(payload or {}).encode("utf-8")
+    req = urllib.request.Request(url.rstrip("/") + path, data=data if payload is not None else None,
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Long-lived evaluation daemon with a preloaded truth set")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="Load the truth set and serve /score on localhost")
+    p_serve.add_argument("--true_df", default="data/train_dataset.csv", help="Path to ground truth CSV containing err_sentence, cor_sentence, or a compiled truth store directory")
+    p_serve.add_argument("--host", default=DEFAULT_HOST, help="Loopback address to bind (non-loopback hosts are refused)")
+    p_serve.add_argument("--output_dir", default=".", help="Directory that analysis CSV outputs requested by clients must be inside")
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+
+    p_score = sub.add_parser("score", help="Score a submission file against the running daemon")
+    p_score.add_argument("--pred_df", default="submission.csv", help="Path to submission CSV containing cor_sentence")
+    p_score.add_argument("--output", default=None, help="Path to save analysis DataFrame as CSV (optional)")
+    p_score.add_argument("--url", default=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+
+    p_stop = sub.add_parser("stop", help="Stop the running daemon")
+    p_stop.add_argument("--url", default=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        server = EvalServer((args.host, args.port), args.true_df, output_dir=args.output_dir)
+        print(f"✅ Truth set loaded: {len(server.truth)} rows from {server.truth.path}")
+        print(f"Serving on http://{args.host}:{args.port} (POST /score, GET /health, POST /shutdown)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    elif args.command == "score":
+        payload = {"pred_path": os.path.abspath(args.pred_df)}
+        if args.output:
+            payload["output"] = os.path.abspath(args.output)
+        result = request_json(args.url, "/score", payload)
+        if "error" in result:
+            print(f"Error: {result['error']}", file=sys.stderr)
+            return 1
+        print("=== 평가 결과 ===")
+        print(f"Recall: {result['recall']:.2f}%")
+        print(f"Precision: {result['precision']:.2f}%\n")
+        print(f"(scored in {result['elapsed_ms']:.1f} ms)")
+        if args.output:
+            print(f"Analysis results saved to {args.output}")
+
+    elif args.command == "stop":
+        print(request_json(args.url, "/shutdown", {}))
+
+
+if __name__ == "__main__":
+    main()
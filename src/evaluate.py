@@ -1,11 +1,18 @@
 import argparse
 import pandas as pd
-import metrics
+from src import metrics
+from src.profiling import Profiler, add_profile_arguments
+from src.truth_store import open_truth
 
 
-def evaluate(true_df: pd.DataFrame, pred_df: pd.DataFrame):
-    if not {"err_sentence", "cor_sentence"}.issubset(true_df.columns):
-        raise ValueError(f"Truth DF must have columns 'err_sentence' and 'cor_sentence' (found: {list(true_df.columns)})")
+# truth store에서 DataFrame으로 디코딩할 컬럼 (문장 컬럼은 채점 중 행별로 지연 디코딩)
+STORE_FRAME_COLUMNS = ["id", "type", "original_target_part", "golden_target_part"]
+
+
+def evaluate(true_df: pd.DataFrame, pred_df: pd.DataFrame, edit_level: bool = False, truth_store=None, profiler=None):
+    truth_columns = truth_store.columns if truth_store is not None else list(true_df.columns)
+    if not {"err_sentence", "cor_sentence"}.issubset(truth_columns):
+        raise ValueError(f"Truth DF must have columns 'err_sentence' and 'cor_sentence' (found: {truth_columns})")
     if "cor_sentence" not in pred_df.columns:
         raise ValueError(f"Prediction DF must have column 'cor_sentence' (found: {list(pred_df.columns)})")
 
@@ -13,39 +20,79 @@ def evaluate(true_df: pd.DataFrame, pred_df: pd.DataFrame):
     if len(true_df) != len(pred_df):
         raise ValueError(f"Length mismatch: truth={len(true_df)} vs pred={len(pred_df)}. Ensure one-to-one rows.")
     if "err_sentence" in pred_df.columns:
-        if not true_df["err_sentence"].astype(str).equals(pred_df["err_sentence"].astype(str)):
+        if truth_store is not None:
+            # 결측 원문은 astype(str)과 같이 'nan'으로 비교
+            same_order = truth_store.column("err_sentence", na_value="nan").equals(pred_df["err_sentence"].astype(str).tolist())
+        else:
+            same_order = true_df["err_sentence"].astype(str).equals(pred_df["err_sentence"].astype(str))
+        if not same_order:
             raise ValueError("Row order/content mismatch in 'err_sentence' between truth and submission.")
 
     pred_df = pd.DataFrame({"cor_sentence": pred_df["cor_sentence"].astype(str)})
 
     # Get results from metrics
-    results = metrics.evaluate_correction(true_df, pred_df)
+    # truth_store(TruthStore)가 있으면 미리 계산한 원문 토큰 / 정답 차이점과 지연 디코딩되는 문장 컬럼을 사용
+    if truth_store is not None:
+        results = metrics.evaluate_correction(true_df, pred_df, edit_level=edit_level,
+                                              original_tokens=truth_store.original_tokens,
+                                              golden_differences=truth_store.golden_differences, profiler=profiler,
+                                              err_sentences=truth_store.column("err_sentence"),
+                                              cor_sentences=truth_store.column("cor_sentence"))
+    else:
+        results = metrics.evaluate_correction(true_df, pred_df, edit_level=edit_level, profiler=profiler)
     
     # Add original_target_part and golden_target_part to analysis_df if they exist
     if "original_target_part" in true_df.columns and "golden_target_part" in true_df.columns:
         results['analysis_df']['original_target_part'] = true_df['original_target_part'].values
         results['analysis_df']['golden_target_part'] = true_df['golden_target_part'].values
     
+    # 편집 단위 결과에 id(없으면 eda_failure_analysis.py와 같이 1부터 시작하는 행 번호)와 type을 붙임
+    if edit_level:
+        edits_df = results['edits_df']
+        rows = edits_df.pop('row').to_numpy(dtype='int64')
+        ids = true_df['id'].astype(str).to_numpy() if 'id' in true_df.columns else (true_df.index + 1).astype(str).to_numpy()
+        edits_df.insert(0, 'id', ids[rows])
+        edits_df['type'] = true_df['type'].to_numpy()[rows] if 'type' in true_df.columns else None
+    
     return results
 
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Evaluate submission against truth using metrics.py")
     parser.add_argument("--true_df", default="data/train_dataset.csv", help="Path to ground truth CSV containing err_sentence, cor_sentence")
+    parser.add_argument("--truth_store", default=None, help="Path to a store compiled by `cli.py truth-store compile` (used instead of --true_df)")
     parser.add_argument("--pred_df", default="submission.csv", help="Path to submission CSV containing cor_sentence")
     parser.add_argument("--output",  default="analysis.csv", help="Path to save analysis DataFrame as CSV (optional)")
-    args = parser.parse_args()
+    parser.add_argument("--edits_output", default=None, help="Path to save the edit-level index (one row per golden/predicted edit) as Parquet (optional)")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
 
-    true_df = pd.read_csv(args.true_df)
-    sub_df = pd.read_csv(args.pred_df)
+    profiler = Profiler(enabled=args.profile, cprofile=args.profile_cprofile)
+    profiler.start()
+
+    with profiler.stage("read_csv"):
+        if args.truth_store:
+            true_df, store = open_truth(args.truth_store, columns=STORE_FRAME_COLUMNS)
+        else:
+            true_df, store = pd.read_csv(args.true_df), None
+        sub_df = pd.read_csv(args.pred_df)
+
+    with profiler.stage("evaluate"):
+        results = evaluate(true_df, sub_df, edit_level=bool(args.edits_output), truth_store=store, profiler=profiler)
 
-    results = evaluate(true_df, sub_df)
-    
     # Export analysis DataFrame if output path is provided
     if args.output:
-        results['analysis_df'].to_csv(args.output, index=False)
+        with profiler.stage("to_csv"):
+            results['analysis_df'].to_csv(args.output, index=False)
         print(f"Analysis results saved to {args.output}")
 
+    if args.edits_output:
+        with profiler.stage("to_parquet"):
+            results['edits_df'].to_parquet(args.edits_output, index=False)
+        print(f"Edit-level index saved to {args.edits_output} ({len(results['edits_df'])} edits)")
+
+    profiler.report(args.profile_output, top_n=args.profile_top, pstats_path=args.profile_dump)
+
 
 if __name__ == "__main__":
     main()
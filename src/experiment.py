@@ -0,0 +1,246 @@
+"""
+프롬프트 A/B 실험 러너 (점진적 층화 표본 + 순차 검정 조기 종료).
+
+    python cli.py experiment --true_df data/train_dataset.csv --variant PROMPT_V34 --variant v35=prompts/v35.txt
+
+모든 변형을 같은 행에 대해 동시에 생성/채점하고, 표본을 initial_rows부터 growth배씩 늘려 가며 매 단계(look)마다
+현재 선두 변형과의 행별 F1 기여도 차이를 짝지어 검정합니다. 유의하게 뒤처진 변형은 그 단계에서 탈락하므로
+이후 행에 대해서는 API를 호출하지 않습니다.
+
+행별 F1 기여도는 전체 F1 = 2TP / (2TP + 2FP + FM + FR)을 선두 변형의 F1(f) 주변에서 선형화한 값입니다.
+    c_i = 2·tp_i − f·(2·tp_i + 2·fp_i + fm_i + fr_i)
+두 변형의 c_i 합을 비교하는 것은 같은 행 집합에서 F1을 비교하는 것과 부호가 같습니다.
+"""
+import argparse
+import json
+import math
+import os
+import random
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from statistics import NormalDist
+from typing import Dict, List, Tuple
+
+from src import hedging, telemetry
+
+SYSTEM_MESSAGE = "당신은 한국어 문장 교정 전문가입니다. 맞춤법/띄어쓰기/문장부호/문법을 자연스럽게 교정하세요. 반드시 불필요한 설명 없이 교정된 문장만 출력하세요."
+
+
+def load_variants(specs: List[str]) -> Dict[str, str]:
+    """'PROMPT_NAME'(src/prompts.py 상수) 또는 'name=path.txt' 형식의 변형 목록을 {이름: 템플릿}으로 읽습니다."""
+    from src import prompts
+
+    variants = {}
+    for spec in specs:
+        name, sep, path = spec.partition("=")
+        if sep:
+            with open(path, encoding="utf-8") as f:
+                template = f.read().strip()
+        else:
+            if not hasattr(prompts, name):
+                raise ValueError(f"Unknown prompt '{name}' in src/prompts.py")
+            template = getattr(prompts, name)
+        if "{text}" not in template:
+            raise ValueError(f"Prompt variant '{name}' must contain a {{text}} placeholder")
+        variants[name] = template
+    if len(variants) < 2:
+        raise ValueError("At least two prompt variants are required")
+    return variants
+
+
+def stratified_order(n: int, types, seed: int) -> List[int]:
+    """어떤 앞부분(prefix)을 잘라도 type 비율이 전체와 비슷하도록 행 순서를 섞습니다."""
+    rng = random.Random(seed)
+    groups = defaultdict(list)
+    for i in range(n):
+        groups[types[i] if types is not None else None].append(i)
+
+    keyed = []
+    for rows in groups.values():
+        rng.shuffle(rows)
+        # 각 유형 안에서 (k + U) / n_type 위치에 배치 → 유형별로 균등 간격으로 섞임
+        keyed.extend(((k + rng.random()) / len(rows), i) for k, i in enumerate(rows))
+    return [i for _, i in sorted(keyed)]
+
+
+def look_schedule(n: int, initial_rows: int, growth: float) -> List[int]:
+    sizes = []
+    size = min(initial_rows, n)
+    while size < n:
+        sizes.append(size)
+        size = min(n, max(size + 1, int(math.ceil(size * growth))))
+    sizes.append(n)
+    return sizes
+
+
+def f1_from_counts(tp: int, fp: int, fm: int, fr: int) -> float:
+    denom = 2 * tp + 2 * fp + fm + fr
+    return 2 * tp / denom if denom > 0 else 0.0
+
+
+def contributions(counts: List[Tuple[int, int, int, int]], f: float) -> List[float]:
+    return [2 * tp - f * (2 * tp + 2 * fp + fm + fr) for tp, fp, fm, fr in counts]
+
+
+def paired_z(leader: List[float], other: List[float]) -> float:
+    """선두 - 변형의 행별 기여도 차이에 대한 z 통계량"""
+    diffs = [a - b for a, b in zip(leader, other)]
+    n = len(diffs)
+    if n < 2:
+        return 0.0
+    mean = sum(diffs) / n
+    var = sum((d - mean) ** 2 for d in diffs) / (n - 1)
+    if var == 0:
+        return math.inf if mean > 0 else 0.0
+    return mean / math.sqrt(var / n)
+
+
+def run_experiment(client, model: str, truth, variants: Dict[str, str], initial_rows: int = 20, growth: float = 2.0,
+                   alpha: float = 0.05, min_rows: int = 20, max_rows: int = None, concurrency: int = 8, seed: int = 42) -> Dict:
+    """변형들을 점진적으로 커지는 층화 표본에서 동시에 평가하고, 뒤처진 변형을 조기 탈락시킵니다."""
+    from tqdm import tqdm
+
+    n_total = len(truth) if max_rows is None else min(max_rows, len(truth))
+    order = stratified_order(len(truth), truth.types, seed)[:n_total]
+    looks = look_schedule(n_total, initial_rows, growth)
+    # Bonferroni: 모든 단계 × 비교 쌍에 대해 유의수준을 나눠 전체 오탈락 확률을 alpha 이하로 유지.
+    # 선두는 데이터를 보고 고르므로 단측 검정이 아닌 양측 기준(alpha / 2)을 사용
+    z_crit = NormalDist().inv_cdf(1 - alpha / (2 * len(looks) * (len(variants) - 1)))
+
+    active = list(variants)
+    counts: Dict[str, List[Tuple[int, int, int, int]]] = {name: [] for name in variants}
+    eliminated = {}
+    api_calls = 0
+
+    def correct(name: str, i: int) -> str:
+        text = truth.err_sentences_str[i]
+        try:
+            resp = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_MESSAGE},
+                    {"role": "user", "content": variants[name].format(text=text)},
+                ],
+                temperature=0.0,
+            )
+            return resp.choices[0].message.content.strip()
+        except Exception as e:
+            print(f"\n[Error] {name}: {e}. 원문 유지.")
+            return text
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for look, size in enumerate(looks, start=1):
+            rows = order[done:size]
+            jobs = [(name, i) for name in active for i in rows]
+            outputs = list(tqdm(pool.map(lambda job: correct(*job), jobs), total=len(jobs), desc=f"Look {look}/{len(looks)} ({size} rows)"))
+            api_calls += len(jobs)
+            for (name, i), prediction in zip(jobs, outputs):
+                counts[name].append(truth.score_row(i, prediction))
+            done = size
+
+            totals = {name: [sum(c[k] for c in counts[name]) for k in range(4)] for name in active}
+            f1 = {name: f1_from_counts(*totals[name]) for name in active}
+            leader = max(active, key=lambda name: f1[name])
+            print(f"[Look {look}] rows={size} " + " ".join(f"{name}={f1[name] * 100:.2f}" for name in active))
+
+            if size < min_rows:
+                continue
+            leader_c = contributions(counts[leader], f1[leader])
+            for name in list(active):
+                if name == leader:
+                    continue
+                z = paired_z(leader_c, contributions(counts[name], f1[leader]))
+                if z > z_crit:
+                    active.remove(name)
+                    eliminated[name] = {"look": look, "rows": size, "z": z, "leader": leader}
+                    print(f"  ✂ {name} eliminated (z={z:.2f} > {z_crit:.2f} vs {leader})")
+            if len(active) == 1:
+                break
+
+    full_cost = len(variants) * len(truth)
+    report = {
+        "model": model,
+        "rows_total": len(truth),
+        "looks": looks,
+        "alpha": alpha,
+        "z_critical": z_crit,
+        "api_calls": api_calls,
+        "full_run_api_calls": full_cost,
+        "api_calls_saved": full_cost - api_calls,
+        "saved_ratio": 1 - api_calls / full_cost if full_cost else 0.0,
+        "active": active,
+        "variants": {},
+    }
+    for name in variants:
+        tp, fp, fm, fr = [sum(c[k] for c in counts[name]) for k in range(4)]
+        report["variants"][name] = {
+            "rows": len(counts[name]),
+            "f1": f1_from_counts(tp, fp, fm, fr) * 100,
+            "recall": tp / (tp + fp + fm) * 100 if (tp + fp + fm) > 0 else 0.0,
+            "precision": tp / (tp + fp + fr) * 100 if (tp + fp + fr) > 0 else 0.0,
+            "counts": {"tp": tp, "fp": fp, "fm": fm, "fr": fr},
+            "status": "eliminated" if name in eliminated else "active",
+            **({"eliminated": eliminated[name]} if name in eliminated else {}),
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prompt A/B experiment runner with stratified incremental samples and early stopping")
+    parser.add_argument("--true_df", default="data/train_dataset.csv", help="Path to ground truth CSV containing err_sentence, cor_sentence (and type)")
+    parser.add_argument("--variant", action="append", required=True, help="Prompt variant: a constant name in src/prompts.py or name=path/to/prompt.txt (repeat)")
+    parser.add_argument("--model", default="solar-pro2", help="Model name (default: solar-pro2)")
+    parser.add_argument("--initial_rows", type=int, default=20, help="Rows in the first look")
+    parser.add_argument("--growth", type=float, default=2.0, help="Sample growth factor between looks")
+    parser.add_argument("--min_rows", type=int, default=20, help="Do not eliminate before this many rows")
+    parser.add_argument("--max_rows", type=int, default=None, help="Cap on the number of training rows used")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Family-wise error rate for eliminating a variant")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent API requests")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--report", default="experiment_report.json", help="Path to save the JSON report")
+    parser.add_argument("--telemetry_dir", default=None, help="Directory for the run summary JSON and OpenMetrics file (optional)")
+    hedging.add_hedge_arguments(parser)
+    telemetry.add_price_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    from openai import OpenAI
+    from src.eval_daemon import TruthSet
+
+    load_dotenv()
+    variants = load_variants(args.variant)
+    truth = TruthSet(args.true_df)
+
+    api_key = os.getenv("UPSTAGE_API_KEY")
+    if not api_key:
+        raise ValueError("UPSTAGE_API_KEY not found in environment variables. Please check your .env file.")
+    tel = telemetry.start("experiment", prices=telemetry.prices_from_args(args))
+    client = tel.instrument(OpenAI(api_key=api_key, base_url="https://api.upstage.ai/v1"))
+    hedger = hedging.from_args(args, client, tel)
+
+    print(f"Model: {args.model}")
+    print(f"Variants: {', '.join(variants)} on {len(truth)} rows")
+
+    report = run_experiment(
+        client, args.model, truth, variants,
+        initial_rows=args.initial_rows, growth=args.growth, alpha=args.alpha, min_rows=args.min_rows,
+        max_rows=args.max_rows, concurrency=args.concurrency, seed=args.seed,
+    )
+
+    print("\n=== 실험 결과 ===")
+    for name, v in sorted(report["variants"].items(), key=lambda item: -item[1]["f1"]):
+        print(f"{name:<20} F1={v['f1']:.2f} R={v['recall']:.2f} P={v['precision']:.2f} rows={v['rows']} [{v['status']}]")
+    print(f"API calls: {report['api_calls']} / full run {report['full_run_api_calls']} "
+          f"(saved {report['api_calls_saved']}, {report['saved_ratio'] * 100:.1f}%)")
+
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ Report saved to {args.report}")
+    if hedger is not None:
+        hedger.finish()
+    tel.finish(args.telemetry_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+느린 응답(straggler)에 대한 요청 헤징.
+
+호출이 최근 지연 시간의 적응형 백분위수(기본 p95)를 넘기면 같은 요청을 한 번 더 보내고, 먼저 도착한 응답을 사용합니다.
+추가 요청 비율은 max_hedge_rate로 제한됩니다. Telemetry.instrument 다음에 감싸면 헤지 요청도 개별 API 호출로 기록되고,
+헤지 발생/승리 수는 event(hedge_issued, hedge_won)로, 헤지 비율과 절약한 지연 시간은 gauge로 남습니다.
+
+    tel = telemetry.start("baseline_generate")
+    client = tel.instrument(OpenAI(...))
+    hedger = hedging.from_args(args, client, tel)   # --hedge가 없으면 None
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Dict, Optional
+
+from src.telemetry import _percentile
+
+
+class Hedger:
+    """client.chat.completions.create를 헤징 래퍼로 교체합니다."""
+
+    def __init__(self, percentile: float = 95, max_hedge_rate: float = 0.1, window: int = 200, min_samples: int = 20,
+                 min_delay: float = 0.5, max_workers: int = 32, telemetry=None):
+        self.percentile = percentile
+        self.max_hedge_rate = max_hedge_rate
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.telemetry = telemetry
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def hedge_delay(self) -> Optional[float]:
+        """헤지 요청을 보낼 대기 시간. 표본이 부족하면 None (헤징 안 함)"""
+        with self._lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            return max(self.min_delay, _percentile(sorted(self.latencies), self.percentile))
+
+    def _reserve_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.max_hedge_rate * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def _submit(self, create, args, kwargs):
+        """호출 스레드의 telemetry step 태그를 유지한 채 풀에서 실행하고, 요청 자체의 지연 시간을 기록"""
+        step = self.telemetry.current_step if self.telemetry is not None else None
+
+        def call():
+            started = time.perf_counter()
+            with self.telemetry.step(step) if step is not None else nullcontext():
+                try:
+                    return create(*args, **kwargs)
+                finally:
+                    with self._lock:
+                        self.latencies.append(time.perf_counter() - started)
+
+        return self._pool.submit(call)
+
+    def wrap(self, client):
+        """client를 그대로 반환합니다."""
+        create = client.chat.completions.create
+
+        def hedged_create(*args, **kwargs):
+            with self._lock:
+                self.requests += 1
+            delay = self.hedge_delay()
+            primary = self._submit(create, args, kwargs)
+            if delay is None or wait([primary], timeout=delay).done or not self._reserve_hedge():
+                return primary.result()
+
+            if self.telemetry is not None:
+                self.telemetry.record_event("hedge_issued")
+            hedge = self._submit(create, args, kwargs)
+            pending = {primary, hedge}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                succeeded = [f for f in (primary, hedge) if f in done and f.exception() is None]
+                if succeeded:
+                    if succeeded[0] is hedge:
+                        self._record_win(primary)
+                    return succeeded[0].result()
+            # 두 요청 모두 실패하면 원래 요청의 예외를 그대로 전달
+            return primary.result()
+
+        client.chat.completions.create = hedged_create
+        return client
+
+    def _record_win(self, primary):
+        """헤지가 이긴 경우, 원래 요청이 끝났을 때까지 기다리지 않아도 된 시간을 누적"""
+        won_at = time.perf_counter()
+        with self._lock:
+            self.hedge_wins += 1
+        if self.telemetry is not None:
+            self.telemetry.record_event("hedge_won")
+
+        def on_primary_done(future):
+            if future.exception() is None:
+                with self._lock:
+                    self.saved_seconds += time.perf_counter() - won_at
+
+        primary.add_done_callback(on_primary_done)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "saved_seconds": self.saved_seconds,
+                "current_delay": max(self.min_delay, _percentile(sorted(self.latencies), self.percentile)) if self.latencies else None,
+            }
+
+    def finish(self) -> Dict:
+        """남은 요청을 기다린 뒤 헤징 통계를 출력하고 telemetry gauge로 남깁니다."""
+        self._pool.shutdown(wait=True)
+        summary = self.summary()
+        print(f"=== Hedging === requests={summary['requests']} hedges={summary['hedges']} "
+              f"({summary['hedge_rate'] * 100:.1f}%) wins={summary['hedge_wins']} saved={summary['saved_seconds']:.1f}s")
+        if self.telemetry is not None:
+            self.telemetry.record_gauge("hedge_rate", summary["hedge_rate"])
+            self.telemetry.record_gauge("hedge_saved_seconds", summary["saved_seconds"])
+        return summary
+
+
+def add_hedge_arguments(parser):
+    """생성 스크립트 공통 --hedge 옵션"""
+    parser.add_argument("--hedge", action="store_true", help="Send a duplicate request when a call exceeds the adaptive latency percentile")
+    parser.add_argument("--hedge_percentile", type=float, default=95, help="Latency percentile of recent calls after which to hedge (with --hedge)")
+    parser.add_argument("--hedge_max_rate", type=float, default=0.1, help="Maximum fraction of extra hedge requests (with --hedge)")
+
+
+def from_args(args, client, telemetry=None) -> Optional[Hedger]:
+    """--hedge가 있으면 client를 헤징 래퍼로 감싸고 Hedger를 반환합니다."""
+    if not getattr(args, "hedge", False):
+        return None
+    hedger = Hedger(percentile=args.hedge_percentile, max_hedge_rate=args.hedge_max_rate, telemetry=telemetry)
+    hedger.wrap(client)
+    return hedger
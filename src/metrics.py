@@ -1,5 +1,6 @@
+import time
 import pandas as pd
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
 def tokenize(text: str) -> List[str]:
     """텍스트를 토큰으로 분리"""
@@ -39,11 +40,10 @@ def find_lcs(X: List[str], Y: List[str]) -> List[str]:
             j -= 1
     return lcs[::-1]
 
-def find_differences_with_offsets(original: str, corrected: str) -> List[Tuple[str, str, int, int, int, int]]:
-    """원문과 교정문 간의 차이점 찾기"""
-    original_tokens = tokenize(original)
-    corrected_tokens = tokenize(corrected)
-    lcs = find_lcs(original_tokens, corrected_tokens)
+def diff_tokens(original_tokens: List[str], corrected_tokens: List[str], lcs: Optional[List[str]] = None) -> List[Tuple[str, str, int, int, int, int]]:
+    """토큰 단위 LCS 차이점 찾기 (근접 병합 전). lcs를 주면 find_lcs를 다시 계산하지 않습니다."""
+    if lcs is None:
+        lcs = find_lcs(original_tokens, corrected_tokens)
     
     orig_index = 0
     corr_index = 0
@@ -69,8 +69,10 @@ def find_differences_with_offsets(original: str, corrected: str) -> List[Tuple[s
             lcs_index += 1
             orig_index += 1
             corr_index += 1
-            
-    # 근접한 차이점 병합
+    return differences
+
+def merge_close_differences(differences: List[Tuple[str, str, int, int, int, int]]) -> List[Tuple[str, str, int, int, int, int]]:
+    """근접한 차이점 병합"""
     new_differences = []
     for i, d in enumerate(differences):
         if i == 0:
@@ -88,8 +90,73 @@ def find_differences_with_offsets(original: str, corrected: str) -> List[Tuple[s
             
     return new_differences
 
-def evaluate_correction(true_df: pd.DataFrame, pred_df: pd.DataFrame, n_samples: int = 5) -> Dict:
-    """교정 결과 평가 및 점수 계산"""
+def find_differences_with_offsets(original: str, corrected: str) -> List[Tuple[str, str, int, int, int, int]]:
+    """원문과 교정문 간의 차이점 찾기"""
+    return merge_close_differences(diff_tokens(tokenize(original), tokenize(corrected)))
+
+def match_differences(differences_og: List[Tuple], differences_op: List[Tuple]) -> List[Tuple[str, Optional[Tuple], Optional[Tuple]]]:
+    """정답 차이점과 예측 차이점을 원문 시작 위치 기준으로 짝지어 (결과, 정답 차이점, 예측 차이점) 목록을 반환"""
+    matches = []
+    og_idx = 0
+    op_idx = 0
+    
+    while True:
+        if og_idx >= len(differences_og) and op_idx >= len(differences_op):
+            break
+        if og_idx >= len(differences_og):
+            matches.append(('FR', None, differences_op[op_idx]))
+            op_idx += 1
+            continue
+        if op_idx >= len(differences_op):
+            matches.append(('FM', differences_og[og_idx], None))
+            og_idx += 1
+            continue
+        if differences_og[og_idx][2] == differences_op[op_idx][2]:
+            if differences_og[og_idx][1] == differences_op[op_idx][1]:
+                matches.append(('TP', differences_og[og_idx], differences_op[op_idx]))
+            else:
+                matches.append(('FP', differences_og[og_idx], differences_op[op_idx]))
+            og_idx += 1
+            op_idx += 1
+        elif differences_og[og_idx][2] < differences_op[op_idx][2]:
+            matches.append(('FM', differences_og[og_idx], None))
+            og_idx += 1
+        elif differences_og[og_idx][2] > differences_op[op_idx][2]:
+            matches.append(('FR', None, differences_op[op_idx]))
+            op_idx += 1
+    return matches
+
+def count_outcomes(matches: List[Tuple[str, Optional[Tuple], Optional[Tuple]]]) -> Tuple[int, int, int, int]:
+    """match_differences 결과에서 (tp, fp, fm, fr) 개수 계산"""
+    outcomes = [m[0] for m in matches]
+    return outcomes.count('TP'), outcomes.count('FP'), outcomes.count('FM'), outcomes.count('FR')
+
+def edit_records(row: int, matches: List[Tuple[str, Optional[Tuple], Optional[Tuple]]]) -> List[Dict]:
+    """편집 단위 분석용 레코드 (정답/예측 편집 하나당 한 행)"""
+    records = []
+    for outcome, og, op in matches:
+        anchor = og if og is not None else op
+        records.append({
+            'row': row,
+            'outcome': outcome,
+            'orig_start': anchor[2],
+            'orig_end': anchor[3],
+            'original_span': anchor[0],
+            'golden_span': og[1] if og is not None else None,
+            'predicted_span': op[1] if op is not None else None,
+        })
+    return records
+
+def evaluate_correction(true_df: pd.DataFrame, pred_df: pd.DataFrame, n_samples: int = 5, edit_level: bool = False,
+                        original_tokens: Optional[Sequence[List[str]]] = None,
+                        golden_differences: Optional[Sequence[List[Tuple]]] = None, profiler=None,
+                        err_sentences: Optional[Sequence[str]] = None, cor_sentences: Optional[Sequence[str]] = None) -> Dict:
+    """교정 결과 평가 및 점수 계산 (edit_level=True이면 편집 단위 결과 edits_df도 반환)
+
+    original_tokens / golden_differences를 주면 (예: truth_store.TruthStore) 원문 토큰화와 정답 차이점 계산을 건너뜁니다.
+    err_sentences / cor_sentences를 주면 true_df 대신 이 시퀀스에서 행별로 원문/정답을 읽습니다 (예: TruthStore.column).
+    profiler(profiling.Profiler)를 주면 정답 차이점 / 예측 LCS / 예측 차이점 추출·병합 / 매칭 시간을 단계별로 누적합니다.
+    """
     total_tp = 0
     total_fp = 0
     total_fm = 0
@@ -97,46 +164,46 @@ def evaluate_correction(true_df: pd.DataFrame, pred_df: pd.DataFrame, n_samples:
     
     # 결과 분석을 위한 DataFrame 생성
     analysis_data = []
+    edit_data = []
+    clock = time.perf_counter
+    timings = [0.0, 0.0, 0.0, 0.0]
+    
+    if err_sentences is None:
+        err_sentences = true_df['err_sentence'].tolist()
+    if cor_sentences is None:
+        cor_sentences = true_df['cor_sentence'].tolist()
+    predictions = pred_df['cor_sentence'].tolist()
     
     for i in range(len(true_df)):
         sample = {
-            'original': true_df.iloc[i]['err_sentence'],
-            'golden': true_df.iloc[i]['cor_sentence'],
-            'prediction': pred_df.iloc[i]['cor_sentence']
+            'original': err_sentences[i],
+            'golden': cor_sentences[i],
+            'prediction': predictions[i]
         }
         
-        # 각 샘플별 점수 계산
-        differences_og = find_differences_with_offsets(sample['original'], sample['golden'])
-        differences_op = find_differences_with_offsets(sample['original'], sample['prediction'])
-        
-        og_idx = 0
-        op_idx = 0
-        tp = fp = fm = fr = 0
+        # 각 샘플별 점수 계산 (단계별 시간은 profiler가 있을 때만 기록)
+        t0 = clock()
+        if golden_differences is not None:
+            differences_og = golden_differences[i]
+        else:
+            differences_og = find_differences_with_offsets(sample['original'], sample['golden'])
+        t1 = clock()
+        orig_tokens = original_tokens[i] if original_tokens is not None else tokenize(sample['original'])
+        pred_tokens = tokenize(sample['prediction'])
+        lcs = find_lcs(orig_tokens, pred_tokens)
+        t2 = clock()
+        differences_op = merge_close_differences(diff_tokens(orig_tokens, pred_tokens, lcs))
+        t3 = clock()
         
-        while True:
-            if og_idx >= len(differences_og) and op_idx >= len(differences_op):
-                break
-            if og_idx >= len(differences_og):
-                fr += 1
-                op_idx += 1
-                continue
-            if op_idx >= len(differences_op):
-                fm += 1
-                og_idx += 1
-                continue
-            if differences_og[og_idx][2] == differences_op[op_idx][2]:
-                if differences_og[og_idx][1] == differences_op[op_idx][1]:
-                    tp += 1
-                else:
-                    fp += 1
-                og_idx += 1
-                op_idx += 1
-            elif differences_og[og_idx][2] < differences_op[op_idx][2]:
-                fm += 1
-                og_idx += 1
-            elif differences_og[og_idx][2] > differences_op[op_idx][2]:
-                fr += 1
-                op_idx += 1
+        matches = match_differences(differences_og, differences_op)
+        tp, fp, fm, fr = count_outcomes(matches)
+        t4 = clock()
+        timings[0] += t1 - t0
+        timings[1] += t2 - t1
+        timings[2] += t3 - t2
+        timings[3] += t4 - t3
+        if edit_level:
+            edit_data.extend(edit_records(i, matches))
         
         # 분석 데이터에 추가 (개별 샘플별 세부 점수)
         analysis_data.append({
@@ -154,6 +221,10 @@ def evaluate_correction(true_df: pd.DataFrame, pred_df: pd.DataFrame, n_samples:
         total_fm += fm
         total_fr += fr
     
+    if profiler is not None:
+        for name, seconds in zip(('golden_diff', 'prediction_lcs', 'prediction_diff_merge', 'match'), timings):
+            profiler.add(f'evaluate.{name}', seconds, calls=len(true_df))
+
     # 전체 점수 계산
     recall = total_tp / (total_tp + total_fp + total_fm) * 100 if (total_tp + total_fp + total_fm) > 0 else 0.0
     precision = total_tp / (total_tp + total_fp + total_fr) * 100 if (total_tp + total_fp + total_fr) > 0 else 0.0
@@ -166,7 +237,7 @@ def evaluate_correction(true_df: pd.DataFrame, pred_df: pd.DataFrame, n_samples:
     # 분석용 DataFrame 생성
     analysis_df = pd.DataFrame(analysis_data)
     
-    return {
+    results = {
         'recall': recall,
         'precision': precision,
         'true_positives': total_tp,
@@ -174,4 +245,11 @@ def evaluate_correction(true_df: pd.DataFrame, pred_df: pd.DataFrame, n_samples:
         'false_missings': total_fm,
         'false_redundants': total_fr,
         'analysis_df': analysis_df
-    } 
\ No newline at end of file
+    }
+    if edit_level:
+        # 편집이 하나도 없어도 row/orig_start/orig_end가 정수 dtype을 유지하도록 지정 (evaluate.py에서 인덱스로 사용)
+        results['edits_df'] = pd.DataFrame(
+            edit_data,
+            columns=['row', 'outcome', 'orig_start', 'orig_end', 'original_span', 'golden_span', 'predicted_span'],
+        ).astype({'row': 'int64', 'orig_start': 'int64', 'orig_end': 'int64'})
+    return results
@@ -9,7 +9,8 @@ from openai import OpenAI
 from openai import APIError
 
 # <<<--- 변경: prompts.py에서 Multi-Turn 프롬프트 2개를 가져오도록 변경 --->>>
-from prompts import PROMPT_STEP_1, PROMPT_STEP_2 
+from src.prompts import PROMPT_STEP_1, PROMPT_STEP_2 
+from src import chunking, hedging, telemetry
 
 # Load environment variables
 load_dotenv()
@@ -43,15 +44,16 @@ def multi_turn_correction(client: OpenAI, model: str, text: str) -> str:
     step1_prompt = PROMPT_STEP_1.format(text=text)
     
     try:
-        resp_1 = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": SYSTEM_MESSAGE},
-                {"role": "user", "content": step1_prompt},
-            ],
-            temperature=0.0,
-            max_tokens=512 # 오류 목록 XML을 생성하기 위한 충분한 토큰 제공
-        )
+        with telemetry.step("step1"):
+            resp_1 = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_MESSAGE},
+                    {"role": "user", "content": step1_prompt},
+                ],
+                temperature=0.0,
+                max_tokens=512 # 오류 목록 XML을 생성하기 위한 충분한 토큰 제공
+            )
         error_list_raw = resp_1.choices[0].message.content.strip()
         
         # <<<--- 변경된 핵심 로직: XML 태그 추출 --->>>
@@ -67,6 +69,7 @@ def multi_turn_correction(client: OpenAI, model: str, text: str) -> str:
             
     except APIError as e:
         print(f"\n[Warning] 1차 API 호출 실패: {e}. 2차 호출은 기본 프롬프트로 진행됩니다.")
+        telemetry.record_event("step1_failed")
         
     except Exception as e:
         print(f"\n[Warning] 1차 XML 파싱/처리 실패: {e}. 2차 호출은 기본 프롬프트로 진행됩니다.")
@@ -80,14 +83,15 @@ def multi_turn_correction(client: OpenAI, model: str, text: str) -> str:
     )
 
     try:
-        resp_2 = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": SYSTEM_MESSAGE},
-                {"role": "user", "content": step2_prompt},
-            ],
-            temperature=0.0,
-        )
+        with telemetry.step("step2"):
+            resp_2 = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_MESSAGE},
+                    {"role": "user", "content": step2_prompt},
+                ],
+                temperature=0.0,
+            )
         raw_output = resp_2.choices[0].message.content.strip()
         
         # 최종 교정 문장만 파싱 (2차 프롬프트는 문장만 출력하도록 강력하게 지시)
@@ -95,16 +99,30 @@ def multi_turn_correction(client: OpenAI, model: str, text: str) -> str:
         
     except Exception as e:
         print(f"\n[Error] 2차 API 호출 실패: {e}")
+        telemetry.record_event("fallback_to_original")
         return text # 최종 실패 시 원문 반환
 
 
-def main():
+def max_text_tokens() -> int:
+    """
+    2차 호출(프롬프트 + 1차 오류 목록 + 원문 + 교정문)이 TOKEN_LIMIT 안에 들어가는 입력 문장 토큰 수.
+    1차 오류 목록은 max_tokens=512로 제한되므로 그만큼을 미리 뺍니다.
+    """
+    step2 = PROMPT_STEP_2.format(error_list_from_step1="", original_text="")
+    return chunking.text_token_budget([SYSTEM_MESSAGE, step2], copies=2, reserved=512)
+
+
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Generate corrected sentences using Upstage API with Multi-Turn Strategy (XML v2)")
     parser.add_argument("--input", default="data/test.csv", help="Input CSV path containing err_sentence column")
     # <<<--- 변경: 출력 파일명을 새로운 Multi-Turn XML 파일로 변경 --->>>
     parser.add_argument("--output", default="submission/final_submission_multi_turn_xml_v2.csv", help="Output CSV path") 
     parser.add_argument("--model", default="solar-pro2", help="Model name (default: solar-pro2)")
-    args = parser.parse_args()
+    parser.add_argument("--telemetry_dir", default=None, help="Directory for the run summary JSON and OpenMetrics file (optional)")
+    hedging.add_hedge_arguments(parser)
+    telemetry.add_price_arguments(parser)
+    chunking.add_chunk_arguments(parser)
+    args = parser.parse_args(argv)
 
     # Load data
     df = pd.read_csv(args.input)
@@ -117,14 +135,18 @@ def main():
     if not api_key:
         raise ValueError("UPSTAGE_API_KEY not found in environment variables. Please check your .env file.")
     
+    tel = telemetry.start("multi_turn_generate", prices=telemetry.prices_from_args(args))
     try:
-        client = OpenAI(api_key=api_key, base_url="https://api.upstage.ai/v1")
+        client = tel.instrument(OpenAI(api_key=api_key, base_url="https://api.upstage.ai/v1"))
     except Exception as e:
         raise ValueError(f"Failed to initialize OpenAI client: {e}")
+    hedger = hedging.from_args(args, client, tel)
 
     
     print(f"Model: {args.model}")
     print(f"Output: {args.output}")
+    max_chunk_tokens = args.max_chunk_tokens or max_text_tokens()
+    print(f"긴 입력은 문장 경계에서 {max_chunk_tokens} 토큰 이하 조각으로 나눠 교정합니다.")
 
     ids = df["id"].astype(str).tolist() if "id" in df.columns else list(range(1, len(df) + 1))
     err_sentences = df["err_sentence"].astype(str).tolist()
@@ -137,18 +159,23 @@ def main():
             # -----------------------------------------------------------------
             # Multi-Turn Logic Call (2 API calls per sentence)
             # -----------------------------------------------------------------
-            corrected = multi_turn_correction(client, args.model, text)
+            corrected = chunking.correct_chunked(
+                lambda chunk: multi_turn_correction(client, args.model, chunk),
+                text, max_chunk_tokens, chunking.count_text_tokens, max_workers=args.chunk_workers,
+            )
             cor_sentences.append(corrected)
             
         except APIError as e:
             # API 키 만료, 권한 오류 등 심각한 오류 시
             print(f"\n!!! API ERROR on ID {ids[i]} ({text[:50]}...): {e}")
             cor_sentences.append(text) 
+            telemetry.record_event("fallback_to_original")
             
         except Exception as e:
             # 기타 일반 오류
             print(f"\n!!! UNEXPECTED ERROR on ID {ids[i]} ({text[:50]}...): {e}")
             cor_sentences.append(text)
+            telemetry.record_event("fallback_to_original")
 
 
     # Save results with required column names
@@ -162,6 +189,9 @@ def main():
     out_df.to_csv(args.output, index=False)
     
     print(f"✅ Generation complete. Results saved to {args.output}")
+    if hedger is not None:
+        hedger.finish()
+    tel.finish(args.telemetry_dir)
 
 
 if __name__ == "__main__":
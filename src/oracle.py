@@ -0,0 +1,262 @@
+"""
+여러 후보 제출 파일(baseline, CoT 재시도, XML 재시도, 병합 결과 등)에 대한 행 단위 선택 정책 탐색.
+
+    python cli.py oracle --true_df data/train_dataset.csv --candidate baseline=submission.csv --candidate cot=data/fm_recorrected.csv
+
+후보마다 행별 (tp, fp, fm, fr)을 한 번만 계산해 .cache/oracle/에 저장하고, 이후 모든 정책은 이 배열의 인덱싱만으로
+채점합니다(LCS 재계산 없음). 후보 파일에 없는 id의 행과 교정문이 비어 있는(NaN/빈 문자열) 행은 merge_layers와
+마찬가지로 원문 그대로(교정 없음)로 간주합니다.
+
+정책:
+    single        한 후보를 그대로 사용
+    layered       merge_final_submission.merge_layers와 같은 레이어 병합 (Precision-Guard, priority last/first)
+                  예: layered[first] A > B 는 "A가 원문을 그대로 둔 행에만 B를 사용"
+    fewest_edits  원문을 바꾼 후보 중 편집 수가 가장 적은 후보
+    most_edits    원문을 바꾼 후보 중 편집 수가 가장 많은 후보
+    vote          후보 부분집합에서 가장 많은 후보가 낸 교정문 (동률이면 앞 후보)
+    oracle        정답을 보고 행마다 고르는 F1 상한 (참고용, 제출에는 사용할 수 없음)
+"""
+import argparse
+import hashlib
+import itertools
+import os
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+CACHE_DIR = os.path.join(".cache", "oracle")
+CACHE_VERSION = 2
+
+
+class CandidateScores:
+    """후보 C개 × 행 N개의 캐시된 채점 결과"""
+
+    def __init__(self, names: List[str], counts: np.ndarray, changed: np.ndarray, pred_hash: np.ndarray):
+        self.names = names
+        self.counts = counts          # (C, N, 4) int32: tp, fp, fm, fr
+        self.changed = changed        # (C, N) bool: 교정문이 원문과 다름 (merge_layers의 Precision-Guard 기준)
+        self.pred_hash = pred_hash    # (C, N) int64: 교정문 해시 (vote용)
+        self.n_edits = counts[:, :, 0] + counts[:, :, 1] + counts[:, :, 3]  # 예측 편집 수 = tp + fp + fr
+        self.rows = np.arange(counts.shape[1])
+
+    def totals(self, choice: np.ndarray) -> np.ndarray:
+        """행별 선택 후보 인덱스 (N,)에 대한 (tp, fp, fm, fr) 합계"""
+        return self.counts[choice, self.rows].sum(axis=0)
+
+
+def _hash_text(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def _cache_path(candidate_path: str, truth) -> str:
+    digest = hashlib.sha1()
+    with open(candidate_path, "rb") as f:
+        digest.update(f.read())
+    digest.update(f"{truth.path}:{truth.mtime}:{CACHE_VERSION}".encode("utf-8"))
+    return os.path.join(CACHE_DIR, f"{digest.hexdigest()}.npz")
+
+
+def align_predictions(truth, candidate_path: str) -> List[str]:
+    """
+    후보 CSV를 정답 행 순서로 정렬합니다. id가 있으면 id로 맞추고, 없는 행은 원문을 사용합니다.
+    교정문이 NaN/빈 문자열인 행도 원문을 사용합니다 (merge_layers는 이런 행을 덮어쓰지 않으며, 문장 전체 삭제로 채점하면 안 됨).
+    """
+    import pandas as pd
+
+    df = pd.read_csv(candidate_path, dtype={"id": str, "err_sentence": str, "cor_sentence": str})
+    if "cor_sentence" not in df.columns:
+        raise ValueError(f"{candidate_path} must contain 'cor_sentence' column (found: {list(df.columns)})")
+
+    if "id" in df.columns:
+        df = df.drop_duplicates("id", keep="last")
+        unknown = set(df["id"]) - set(truth.ids)
+        if unknown:
+            raise ValueError(f"{candidate_path}: {len(unknown)} ids not in the truth set (e.g. {sorted(unknown)[:3]})")
+        position = {id_: i for i, id_ in enumerate(truth.ids)}
+        rows = df["id"].map(position).to_numpy()
+    else:
+        if len(df) != len(truth):
+            raise ValueError(f"{candidate_path} has no 'id' column and length {len(df)} != truth {len(truth)}")
+        rows = np.arange(len(df))
+
+    if "err_sentence" in df.columns:
+        expected = [truth.err_sentences_str[i] for i in rows]
+        if df["err_sentence"].astype(str).tolist() != expected:
+            raise ValueError(f"Row order/content mismatch in 'err_sentence' between truth and {candidate_path}.")
+
+    predictions = list(truth.err_sentences_str)
+    for i, prediction in zip(rows, df["cor_sentence"]):
+        if isinstance(prediction, str) and prediction.strip():
+            predictions[i] = prediction
+    return predictions
+
+
+def score_candidate(truth, candidate_path: str, use_cache: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """후보 하나의 행별 (tp, fp, fm, fr), 원문 변경 여부, 교정문 해시 (캐시 사용)"""
+    cache_path = _cache_path(candidate_path, truth)
+    if use_cache and os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        return cached["counts"], cached["changed"], cached["pred_hash"]
+
+    predictions = align_predictions(truth, candidate_path)
+    counts = np.array([truth.score_row(i, p) for i, p in enumerate(predictions)], dtype=np.int32).reshape(-1, 4)
+    changed = np.array([p.strip() != e.strip() for p, e in zip(predictions, truth.err_sentences_str)], dtype=bool)
+    pred_hash = np.array([_hash_text(p.strip()) for p in predictions], dtype=np.int64)
+
+    if use_cache:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        np.savez(cache_path, counts=counts, changed=changed, pred_hash=pred_hash)
+    return counts, changed, pred_hash
+
+
+def load_scores(truth, candidates: Dict[str, str], use_cache: bool = True) -> CandidateScores:
+    results = [score_candidate(truth, path, use_cache) for path in candidates.values()]
+    return CandidateScores(
+        list(candidates),
+        np.stack([r[0] for r in results]),
+        np.stack([r[1] for r in results]),
+        np.stack([r[2] for r in results]),
+    )
+
+
+# ----------------------------------------------------------------------
+# 선택 정책: 모두 행별 후보 인덱스 (N,)를 반환
+# ----------------------------------------------------------------------
+def layered_choice(scores: CandidateScores, order: Sequence[int], priority: str = "last") -> np.ndarray:
+    """merge_layers와 같은 규칙: 첫 후보가 base, 이후 후보는 원문을 바꾼 행만 덮어씀"""
+    choice = np.full(len(scores.rows), order[0])
+    claimed = np.zeros(len(scores.rows), dtype=bool)
+    for c in order[1:]:
+        mask = scores.changed[c] & ~claimed if priority == "first" else scores.changed[c]
+        choice[mask] = c
+        claimed |= mask
+    return choice
+
+
+def edits_choice(scores: CandidateScores, subset: Sequence[int], fewest: bool = True) -> np.ndarray:
+    """원문을 바꾼 후보 중 편집 수가 가장 적은(많은) 후보. 아무도 바꾸지 않았으면 첫 후보"""
+    subset = np.asarray(subset)
+    edits = scores.n_edits[subset].astype(np.float64)
+    edits[~scores.changed[subset]] = np.inf if fewest else -np.inf
+    picked = np.argmin(edits, axis=0) if fewest else np.argmax(edits, axis=0)
+    return subset[picked]
+
+
+def vote_choice(scores: CandidateScores, subset: Sequence[int]) -> np.ndarray:
+    """같은 교정문을 낸 후보 수가 가장 많은 후보 (동률이면 subset 순서상 앞 후보)"""
+    subset = np.asarray(subset)
+    hashes = scores.pred_hash[subset]                                   # (k, N)
+    agreement = (hashes[:, None, :] == hashes[None, :, :]).sum(axis=1)  # (k, N)
+    return subset[np.argmax(agreement, axis=0)]
+
+
+def oracle_choice(scores: CandidateScores, iterations: int = 20) -> np.ndarray:
+    """
+    F1 = 2TP / (2TP + 2FP + FM + FR)을 최대화하는 행별 선택 (Dinkelbach 반복).
+    현재 F1 f에서 행마다 2tp − f·(2tp + 2fp + fm + fr)가 가장 큰 후보를 고르면 F1이 단조 증가하고 최적에서 멈춥니다.
+    """
+    tp, fp, fm, fr = (scores.counts[:, :, k].astype(np.float64) for k in range(4))
+    numerator, denominator = 2 * tp, 2 * tp + 2 * fp + fm + fr
+    choice = np.zeros(len(scores.rows), dtype=np.int64)
+    f = 0.0
+    for _ in range(iterations):
+        choice = np.argmax(numerator - f * denominator, axis=0)
+        den = denominator[choice, scores.rows].sum()
+        new_f = numerator[choice, scores.rows].sum() / den if den > 0 else 0.0
+        if new_f <= f:
+            break
+        f = new_f
+    return choice
+
+
+def enumerate_policies(scores: CandidateScores, max_layers: int = 3) -> List[Tuple[str, str, np.ndarray]]:
+    """(정책 종류, 설명, 행별 선택) 목록"""
+    names = scores.names
+    indices = range(len(names))
+    policies = []
+    for c in indices:
+        policies.append(("single", names[c], np.full(len(scores.rows), c)))
+    for k in range(2, min(max_layers, len(names)) + 1):
+        for order in itertools.permutations(indices, k):
+            for priority in ("last", "first"):
+                description = f"[{priority}] " + " > ".join(names[c] for c in order)
+                policies.append(("layered", description, layered_choice(scores, order, priority)))
+        for subset in itertools.combinations(indices, k):
+            description = ", ".join(names[c] for c in subset)
+            policies.append(("fewest_edits", description, edits_choice(scores, subset, fewest=True)))
+            policies.append(("most_edits", description, edits_choice(scores, subset, fewest=False)))
+            if k >= 3:
+                policies.append(("vote", description, vote_choice(scores, subset)))
+    policies.append(("oracle", "upper bound (uses the truth)", oracle_choice(scores)))
+    return policies
+
+
+def evaluate_policies(scores: CandidateScores, policies) -> "pd.DataFrame":
+    import pandas as pd
+
+    records = []
+    for kind, description, choice in policies:
+        tp, fp, fm, fr = (int(x) for x in scores.totals(choice))
+        records.append({
+            "policy": kind,
+            "description": description,
+            "f1": 2 * tp / (2 * tp + 2 * fp + fm + fr) * 100 if (2 * tp + 2 * fp + fm + fr) > 0 else 0.0,
+            "recall": tp / (tp + fp + fm) * 100 if (tp + fp + fm) > 0 else 0.0,
+            "precision": tp / (tp + fp + fr) * 100 if (tp + fp + fr) > 0 else 0.0,
+            "tp": tp, "fp": fp, "fm": fm, "fr": fr,
+            "rows_from": {scores.names[c]: int(n) for c, n in zip(*np.unique(choice, return_counts=True))},
+        })
+    return pd.DataFrame(records).sort_values("f1", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def parse_candidates(specs: List[str]) -> Dict[str, str]:
+    """'name=path.csv' 또는 'path.csv'(이름은 파일명) 목록"""
+    candidates = {}
+    for spec in specs:
+        name, sep, path = spec.partition("=")
+        if not sep:
+            name, path = os.path.splitext(os.path.basename(spec))[0], spec
+        if name in candidates:
+            raise ValueError(f"Duplicate candidate name '{name}'. Use name=path to disambiguate.")
+        candidates[name] = path
+    return candidates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score candidate submissions once per row and search per-row selection policies by training-set F1")
+    parser.add_argument("--true_df", default="data/train_dataset.csv", help="Path to ground truth CSV, or a compiled truth store directory")
+    parser.add_argument("--candidate", action="append", required=True, help="Candidate submission: name=path.csv or path.csv (repeat)")
+    parser.add_argument("--max_layers", type=int, default=3, help="Maximum number of candidates combined in one policy")
+    parser.add_argument("--top", type=int, default=20, help="Number of policies to print")
+    parser.add_argument("--report", default=None, help="Path to save every policy's scores as CSV (optional)")
+    parser.add_argument("--no_cache", action="store_true", help="Recompute per-row scores instead of using .cache/oracle/")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    from src.eval_daemon import TruthSet
+
+    candidates = parse_candidates(args.candidate)
+    truth = TruthSet(args.true_df)
+
+    started = time.perf_counter()
+    scores = load_scores(truth, candidates, use_cache=not args.no_cache)
+    scored = time.perf_counter()
+    policies = enumerate_policies(scores, args.max_layers)
+    report = evaluate_policies(scores, policies)
+    searched = time.perf_counter()
+
+    print(f"Candidates: {', '.join(candidates)} on {len(truth)} rows (scored in {scored - started:.2f}s)")
+    print(f"Policies: {len(report)} evaluated in {searched - scored:.2f}s\n")
+    with pd.option_context("display.max_colwidth", 60, "display.width", 200):
+        print(report.drop(columns=["rows_from"]).head(args.top).to_string(float_format=lambda x: f"{x:.2f}"))
+
+    best = report[report["policy"] != "oracle"].iloc[0]
+    print(f"\nBest policy: {best['policy']} {best['description']} (F1 {best['f1']:.2f}) rows from {best['rows_from']}")
+    if args.report:
+        report.to_csv(args.report, index=False)
+        print(f"✅ Policy report saved to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
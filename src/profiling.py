@@ -0,0 +1,116 @@
+import cProfile
+import json
+import os
+import pstats
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class Profiler:
+    """
+    이름 붙인 단계별 타이머와 (선택) cProfile을 함께 관리합니다.
+    enabled=False이면 stage()는 아무 것도 측정하지 않으므로 스크립트에 그대로 남겨 두어도 됩니다.
+    cprofile=True일 때만 cProfile을 켭니다. 프로파일러의 호출당 오버헤드가 순수 파이썬 LCS 단계를 부풀리므로
+    단계 시간을 비교할 때는 타이머만 사용하세요.
+    """
+
+    def __init__(self, enabled: bool = False, cprofile: bool = False):
+        self.enabled = enabled
+        self.cprofile = enabled and cprofile
+        self.stages: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._started = time.perf_counter()
+
+    def start(self):
+        """전체 실행 시간 측정과 (cprofile=True이면) cProfile 수집을 시작합니다."""
+        if not self.enabled:
+            return
+        self._started = time.perf_counter()
+        if not self.cprofile:
+            return
+        self._cprofile = cProfile.Profile()
+        self._cprofile.enable()
+
+    def stop(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+
+    @contextmanager
+    def stage(self, name: str):
+        """with profiler.stage("read_csv"): ... 형태로 단계 시간을 누적합니다."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float, calls: int = 1):
+        """루프 안에서 직접 누적한 시간을 단계로 기록합니다 (행마다 stage()를 여는 오버헤드를 피할 때)."""
+        if not self.enabled:
+            return
+        entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+        entry["seconds"] += seconds
+        entry["calls"] += calls
+
+    def hotspots(self, top_n: int = 15) -> List[Dict]:
+        """cProfile 결과에서 자체 실행 시간(tottime) 기준 상위 함수"""
+        if self._cprofile is None:
+            return []
+        stats = pstats.Stats(self._cprofile)
+        rows = []
+        for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                "function": f"{os.path.basename(filename)}:{line}({func})",
+                "ncalls": ncalls,
+                "tottime": tottime,
+                "cumtime": cumtime,
+            })
+        rows.sort(key=lambda r: r["tottime"], reverse=True)
+        return rows[:top_n]
+
+    def report(self, output_json: Optional[str] = None, top_n: int = 15, pstats_path: Optional[str] = None) -> Optional[Dict]:
+        """단계별 시간과 상위 hotspot을 출력하고, 타이밍 JSON과 pstats 덤프를 저장합니다."""
+        if not self.enabled:
+            return None
+        self.stop()
+        total = time.perf_counter() - self._started
+        hotspots = self.hotspots(top_n)
+
+        print("\n=== Profile: stages ===")
+        for name, entry in sorted(self.stages.items(), key=lambda item: item[1]["seconds"], reverse=True):
+            share = entry["seconds"] / total * 100 if total > 0 else 0.0
+            print(f"{name:<32} {entry['seconds']:>9.3f}s {share:>5.1f}%  (calls={entry['calls']})")
+        print(f"{'total':<32} {total:>9.3f}s")
+
+        if hotspots:
+            print(f"\n=== Profile: top {len(hotspots)} hotspots (tottime) ===")
+            for row in hotspots:
+                print(f"{row['tottime']:>9.3f}s tot {row['cumtime']:>9.3f}s cum {row['ncalls']:>10}  {row['function']}")
+
+        report = {
+            "total_seconds": total,
+            "stages": [{"name": name, **entry} for name, entry in self.stages.items()],
+            "hotspots": hotspots,
+        }
+        if output_json:
+            with open(output_json, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"Timing JSON saved to {output_json}")
+        if pstats_path and self._cprofile is not None:
+            self._cprofile.dump_stats(pstats_path)
+            print(f"pstats dump saved to {pstats_path} (python -m pstats {pstats_path})")
+        return report
+
+
+def add_profile_arguments(parser):
+    """evaluate.py / 분석 스크립트 공통 --profile 옵션"""
+    parser.add_argument("--profile", action="store_true", help="Record stage timers (including per-row diff/LCS/matching stages)")
+    parser.add_argument("--profile_cprofile", action="store_true", help="Also run cProfile for a hotspot summary (with --profile; inflates stage timers)")
+    parser.add_argument("--profile_output", default="profile_timing.json", help="Path to save the machine-readable timing JSON (with --profile)")
+    parser.add_argument("--profile_top", type=int, default=15, help="Number of hotspot functions to print (with --profile)")
+    parser.add_argument("--profile_dump", default=None, help="Optional path to dump raw cProfile/pstats data (with --profile_cprofile)")
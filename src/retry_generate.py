@@ -7,7 +7,9 @@ from openai import OpenAI
 from openai import APIError
 
 # 새로 추가된 PROMPT_RETRY_COT를 포함하도록 import (prompts.py 수정 필수)
-from prompts import PROMPT_RETRY_COT 
+from src.prompts import PROMPT_RETRY_COT 
+from src.self_consistency import self_consistent_correction
+from src import chunking, hedging, telemetry
 
 # Load environment variables
 load_dotenv()
@@ -33,18 +35,30 @@ def extract_correction(output_text: str, original_text: str) -> str:
     
     return corrected.split('\n')[-1].strip() # 마지막 줄이 최종 교정 문장이라고 가정
 
-def retry_correction(client: OpenAI, model: str, text: str) -> str:
-    """CoT 기반 Single-Turn API 호출을 수행합니다."""
+def retry_correction(client: OpenAI, model: str, text: str, samples: int = 1, min_agreement: float = 0.5, temperature: float = 0.7) -> str:
+    """CoT 기반 Single-Turn API 호출을 수행합니다. samples > 1이면 Self-Consistency 투표로 교정합니다."""
     
     prompt = PROMPT_RETRY_COT.format(text=text)
+    messages = [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": prompt},
+    ]
     
     try:
+        if samples > 1:
+            # 한 번의 요청으로 여러 후보를 받아 편집 단위 다수결로 합침 (Precision-Guard 앙상블)
+            return self_consistent_correction(
+                client, model, messages, text,
+                k=samples,
+                min_agreement=min_agreement,
+                temperature=temperature,
+                max_tokens=2000,
+                parse=extract_correction,
+            )
+
         resp = client.chat.completions.create(
             model=model,
-            messages=[
-                {"role": "system", "content": SYSTEM_MESSAGE},
-                {"role": "user", "content": prompt},
-            ],
+            messages=messages,
             temperature=0.0, # 안정적인 출력을 위해 0.0 유지
             max_tokens=2000 # 2000 토큰 제한 내에서 최대 출력 허용 (FM 문장이 짧은 경우가 많으므로)
         )
@@ -56,15 +70,28 @@ def retry_correction(client: OpenAI, model: str, text: str) -> str:
     except Exception as e:
         # API 오류 또는 파싱 오류 시 원문 반환
         print(f"\n[Error] API 호출 또는 처리 실패: {e}")
+        telemetry.record_event("fallback_to_original")
         return text
 
 
-def main():
+def max_text_tokens() -> int:
+    """CoT 요청(프롬프트 + 입력 문장 + 분석 + 최종 교정문)이 TOKEN_LIMIT 안에 들어가는 입력 문장 토큰 수 (문장이 세 번 들어간다고 봄)"""
+    return chunking.text_token_budget([SYSTEM_MESSAGE, PROMPT_RETRY_COT.format(text="")], copies=3)
+
+
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Re-generate corrections for FM candidates using a strong CoT prompt.")
     parser.add_argument("--input", default="data/fm_candidates_to_retry.csv", help="Input CSV path (FM candidates) to re-correct.")
     parser.add_argument("--output", default="data/fm_recorrected.csv", help="Output CSV path for re-corrected results.")
     parser.add_argument("--model", default="solar-pro2", help="Model name (default: solar-pro2)")
-    args = parser.parse_args()
+    parser.add_argument("--samples", type=int, default=1, help="Self-consistency: number of candidates per sentence (1 = single greedy call)")
+    parser.add_argument("--min_agreement", type=float, default=0.5, help="Self-consistency: keep an edit only if more than this fraction of candidates agree")
+    parser.add_argument("--temperature", type=float, default=0.7, help="Self-consistency: sampling temperature for candidates")
+    parser.add_argument("--telemetry_dir", default=None, help="Directory for the run summary JSON and OpenMetrics file (optional)")
+    hedging.add_hedge_arguments(parser)
+    telemetry.add_price_arguments(parser)
+    chunking.add_chunk_arguments(parser)
+    args = parser.parse_args(argv)
 
     # Load data
     df = pd.read_csv(args.input)
@@ -77,15 +104,21 @@ def main():
     if not api_key:
         raise ValueError("UPSTAGE_API_KEY not found in environment variables. Please check your .env file.")
     
+    tel = telemetry.start("retry_generate", prices=telemetry.prices_from_args(args))
     try:
-        client = OpenAI(api_key=api_key, base_url="https://api.upstage.ai/v1")
+        client = tel.instrument(OpenAI(api_key=api_key, base_url="https://api.upstage.ai/v1"))
     except Exception as e:
         raise ValueError(f"Failed to initialize OpenAI client: {e}")
+    hedger = hedging.from_args(args, client, tel)
 
     
     print(f"Model: {args.model}")
     print(f"FM Candidates to retry: {len(df)}")
+    if args.samples > 1:
+        print(f"Self-Consistency: {args.samples} candidates/sentence, min_agreement > {args.min_agreement}")
     print(f"Output: {args.output}")
+    max_chunk_tokens = args.max_chunk_tokens or max_text_tokens()
+    print(f"긴 입력은 문장 경계에서 {max_chunk_tokens} 토큰 이하 조각으로 나눠 교정합니다.")
 
     ids = df["id"].astype(str).tolist()
     err_sentences = df["err_sentence"].astype(str).tolist()
@@ -93,7 +126,10 @@ def main():
     
     # Process each sentence
     for i, text in enumerate(tqdm(err_sentences, desc="Re-correcting FM")):
-        corrected = retry_correction(client, args.model, text)
+        corrected = chunking.correct_chunked(
+            lambda chunk: retry_correction(client, args.model, chunk, samples=args.samples, min_agreement=args.min_agreement, temperature=args.temperature),
+            text, max_chunk_tokens, chunking.count_text_tokens, max_workers=args.chunk_workers,
+        )
         cor_sentences.append(corrected)
 
     # Save results
@@ -107,6 +143,9 @@ def main():
     out_df.to_csv(args.output, index=False)
     
     print(f"✅ Re-correction complete. Results saved to {args.output}")
+    if hedger is not None:
+        hedger.finish()
+    tel.finish(args.telemetry_dir)
 
 
 if __name__ == "__main__":
@@ -4,17 +4,15 @@ import pandas as pd
 from tqdm import tqdm
 from dotenv import load_dotenv
 from openai import OpenAI, APIError
-import tiktoken # 토큰 계산 라이브러리 추가
 
 # 새로 추가된 Multi-Turn 프롬프트를 포함하도록 import
-from prompts import PROMPT_STEP1_XML, PROMPT_STEP2_XML
+from src.prompts import PROMPT_STEP1_XML, PROMPT_STEP2_XML
+from src import chunking, hedging, telemetry
+from src.chunking import TOKEN_LIMIT, count_text_tokens, get_encoder
 
 # Load environment variables
 load_dotenv()
 
-# 토큰 계산기 초기화 (GPT-4용이지만 Solar Pro 2의 토큰 근사치 계산에 활용)
-TOKEN_LIMIT = 2000
-ENCODER = tiktoken.get_encoding("cl100k_base") 
 SYSTEM_MESSAGE = "당신은 한국어 문장 교정 전문가이며, 지시에 따라 XML 형식을 준수하고 단계별 작업을 정확하게 수행합니다."
 
 
@@ -24,11 +22,19 @@ def count_tokens(messages: list) -> int:
     for message in messages:
         # role, content, name 등의 토큰을 근사 계산
         if message.get("content"):
-            total_tokens += len(ENCODER.encode(message["content"]))
+            total_tokens += len(get_encoder().encode(message["content"]))
         total_tokens += 4 # role, content, name 등의 오버헤드
     return total_tokens + 2 # 마지막 메시지의 오버헤드
 
 
+def max_text_tokens() -> int:
+    """
+    2-Step 세션(Step 1 입력 + Step 1 출력 + Step 2 입력 + Step 2 출력)이 TOKEN_LIMIT 안에 들어가는 입력 문장 토큰 수.
+    문장은 Step 1 입력, Step 1 출력(오류 목록), Step 2 출력(교정문)에 한 번씩, 총 세 번 들어간다고 보고 200토큰 여유를 둡니다.
+    """
+    return chunking.text_token_budget([SYSTEM_MESSAGE, PROMPT_STEP1_XML.format(text=""), PROMPT_STEP2_XML], copies=3)
+
+
 def retry_correction_multi_turn_v2(client: OpenAI, model: str, text: str) -> str:
     """Multi-Turn 2-Step API 호출을 수행합니다 (2000 토큰 안전 로직 포함)."""
     
@@ -41,25 +47,28 @@ def retry_correction_multi_turn_v2(client: OpenAI, model: str, text: str) -> str
     current_tokens = count_tokens(messages_step1)
     if current_tokens >= TOKEN_LIMIT:
         print(f"\n[Safety Skip] 입력 토큰 초과 ({current_tokens} >= 2000). 원문 유지.")
+        telemetry.record_event("token_limit_skip")
         return text
 
     try:
         # Step 1 출력 토큰 제한: 입력 토큰을 제외한 나머지 예산 내에서 출력되도록 설정
         max_output_tokens_step1 = TOKEN_LIMIT - current_tokens - 100 
         
-        resp1 = client.chat.completions.create(
-            model=model,
-            messages=messages_step1,
-            temperature=0.0,
-            max_tokens=max_output_tokens_step1 if max_output_tokens_step1 > 256 else 256
-        )
+        with telemetry.step("step1"):
+            resp1 = client.chat.completions.create(
+                model=model,
+                messages=messages_step1,
+                temperature=0.0,
+                max_tokens=max_output_tokens_step1 if max_output_tokens_step1 > 256 else 256
+            )
         step1_output = resp1.choices[0].message.content.strip()
         
         # Step 1 출력 토큰 업데이트
-        current_tokens += len(ENCODER.encode(step1_output)) 
+        current_tokens += len(get_encoder().encode(step1_output)) 
 
     except APIError as e:
         print(f"\n[Error] Step 1 API 호출 실패: {e}. 원문 유지.")
+        telemetry.record_event("fallback_to_original")
         return text 
     
     # 2. Step 2: 최종 교정 문장만 출력 (Precision 확보)
@@ -73,18 +82,20 @@ def retry_correction_multi_turn_v2(client: OpenAI, model: str, text: str) -> str
     current_tokens = count_tokens(messages_step2)
     if current_tokens >= TOKEN_LIMIT:
         print(f"\n[Safety Skip] Step 2 입력 토큰 초과 ({current_tokens} >= 2000). 원문 유지.")
+        telemetry.record_event("token_limit_skip")
         return text
     
     try:
         # Step 2 출력 토큰 제한: 교정 문장의 최대 길이보다 조금 더 크게 설정
         max_output_tokens_step2 = TOKEN_LIMIT - current_tokens - 100
         
-        resp2 = client.chat.completions.create(
-            model=model,
-            messages=messages_step2,
-            temperature=0.0,
-            max_tokens=max_output_tokens_step2 if max_output_tokens_step2 > 128 else 128
-        )
+        with telemetry.step("step2"):
+            resp2 = client.chat.completions.create(
+                model=model,
+                messages=messages_step2,
+                temperature=0.0,
+                max_tokens=max_output_tokens_step2 if max_output_tokens_step2 > 128 else 128
+            )
         step2_output = resp2.choices[0].message.content.strip()
         
         # 교정 문장만 반환
@@ -92,15 +103,20 @@ def retry_correction_multi_turn_v2(client: OpenAI, model: str, text: str) -> str
         
     except Exception as e:
         print(f"\n[Error] Step 2 API 호출 또는 처리 실패: {e}. 원문 유지.")
+        telemetry.record_event("fallback_to_original")
         return text
 
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Re-generate corrections for 2nd FM candidates using a 2-Step Multi-Turn XML prompt with 2000 token safety.")
     parser.add_argument("--input", default="data/fm_candidates_to_retry_v2.csv", help="Input CSV path (2nd FM candidates) to re-correct.")
     parser.add_argument("--output", default="data/fm_recorrected_v2.csv", help="Output CSV path for 2nd re-corrected results.")
     parser.add_argument("--model", default="solar-pro2", help="Model name (default: solar-pro2)")
-    args = parser.parse_args()
+    chunking.add_chunk_arguments(parser)
+    parser.add_argument("--telemetry_dir", default=None, help="Directory for the run summary JSON and OpenMetrics file (optional)")
+    hedging.add_hedge_arguments(parser)
+    telemetry.add_price_arguments(parser)
+    args = parser.parse_args(argv)
 
     # Load data
     df = pd.read_csv(args.input)
@@ -113,16 +129,20 @@ def main():
     if not api_key:
         raise ValueError("UPSTAGE_API_KEY not found in environment variables. Please check your .env file.")
     
+    tel = telemetry.start("retry_generate_v2", prices=telemetry.prices_from_args(args))
     try:
-        client = OpenAI(api_key=api_key, base_url="https://api.upstage.ai/v1")
+        client = tel.instrument(OpenAI(api_key=api_key, base_url="https://api.upstage.ai/v1"))
     except Exception as e:
         raise ValueError(f"Failed to initialize OpenAI client: {e}")
+    hedger = hedging.from_args(args, client, tel)
 
     
     print(f"Model: {args.model}")
     print(f"2nd FM Candidates to retry: {len(df)} (9개 문장)")
     print(f"Output: {args.output}")
     print(f"!!! 2-Step Multi-Turn 전략으로 2000 토큰 제한을 안전하게 준수합니다. !!!")
+    max_chunk_tokens = args.max_chunk_tokens or max_text_tokens()
+    print(f"긴 입력은 문장 경계에서 {max_chunk_tokens} 토큰 이하 조각으로 나눠 교정합니다.")
 
 
     ids = df["id"].astype(str).tolist()
@@ -131,7 +151,10 @@ def main():
     
     # Process each sentence
     for i, text in enumerate(tqdm(err_sentences, desc="2nd Re-correcting FM (2-Step Multi-Turn)")):
-        corrected = retry_correction_multi_turn_v2(client, args.model, text)
+        corrected = chunking.correct_chunked(
+            lambda chunk: retry_correction_multi_turn_v2(client, args.model, chunk),
+            text, max_chunk_tokens, count_text_tokens, max_workers=args.chunk_workers,
+        )
         cor_sentences.append(corrected)
 
     # Save results
@@ -145,6 +168,9 @@ def main():
     out_df.to_csv(args.output, index=False)
     
     print(f"✅ 2nd Re-correction complete. Results saved to {args.output}")
+    if hedger is not None:
+        hedger.finish()
+    tel.finish(args.telemetry_dir)
 
 
 if __name__ == "__main__":
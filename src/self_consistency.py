@@ -0,0 +1,108 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from openai import OpenAI, APIError
+
+from src.metrics import tokenize, diff_tokens
+
+# (원문 시작, 원문 끝, 교정 토큰들) - 원문 토큰 구간을 교정 토큰으로 치환하는 편집
+Edit = Tuple[int, int, Tuple[str, ...]]
+
+
+def sample_candidates(client: OpenAI, model: str, messages: list, k: int, temperature: float = 0.7, max_tokens: Optional[int] = None) -> List[str]:
+    """
+    한 번의 요청(n 파라미터)으로 k개의 후보를 받습니다.
+    엔드포인트가 n을 지원하지 않거나 후보를 덜 돌려주면 나머지는 동시 요청으로 채웁니다.
+    """
+    kwargs = {"model": model, "messages": messages, "temperature": temperature}
+    if max_tokens is not None:
+        kwargs["max_tokens"] = max_tokens
+
+    candidates = []
+    try:
+        resp = client.chat.completions.create(n=k, **kwargs)
+        candidates = [c.message.content.strip() for c in resp.choices if c.message.content]
+    except APIError as e:
+        print(f"\n[Warning] n={k} 요청 실패, 개별 동시 요청으로 전환합니다: {e}")
+
+    missing = k - len(candidates)
+    if missing <= 0:
+        return candidates[:k]
+
+    def _single(_):
+        try:
+            resp = client.chat.completions.create(**kwargs)
+            return resp.choices[0].message.content.strip()
+        except Exception as e:
+            print(f"\n[Error] 후보 생성 실패: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=missing) as pool:
+        candidates.extend(c for c in pool.map(_single, range(missing)) if c)
+    return candidates
+
+
+def extract_edits(original_tokens: List[str], candidate: str) -> List[Edit]:
+    """
+    평가 지표와 같은 LCS 정렬(metrics.diff_tokens)로 후보를 원문에 맞춰 편집 목록을 만듭니다.
+    find_differences_with_offsets의 근접 병합 이전 단위로 투표해야 후보마다 병합 범위가 달라도 같은 편집끼리 묶입니다.
+    """
+    candidate_tokens = tokenize(candidate)
+    return [
+        (orig_start, orig_end, tuple(candidate_tokens[corr_start:corr_end]))
+        for _, _, orig_start, orig_end, corr_start, corr_end in diff_tokens(original_tokens, candidate_tokens)
+    ]
+
+
+def _overlaps(a: Edit, b: Edit) -> bool:
+    # 같은 위치의 삽입끼리도 충돌로 간주
+    return a[0] == b[0] or (a[0] < b[1] and b[0] < a[1])
+
+
+def vote_edits(original: str, candidates: List[str], min_agreement: float = 0.5, total: Optional[int] = None) -> str:
+    """
+    후보들이 제안한 편집 중 min_agreement 비율을 초과하는 후보가 동의한 편집만 원문에 적용합니다 (Precision-Guard).
+    서로 겹치는 편집은 득표가 많은 쪽을 우선합니다.
+    total은 요청한 후보 수(k)로, 일부 요청이 실패해도 비율의 분모는 k로 유지합니다 (실패한 후보는 무변경 표로 간주).
+    """
+    if not candidates:
+        return original
+    total = max(total or 0, len(candidates))
+
+    original_tokens = tokenize(original)
+    votes = Counter()
+    for candidate in candidates:
+        votes.update(set(extract_edits(original_tokens, candidate)))
+
+    accepted: List[Edit] = []
+    for edit, count in sorted(votes.items(), key=lambda item: (-item[1], item[0][0])):
+        if count / total <= min_agreement:
+            break
+        if not any(_overlaps(edit, other) for other in accepted):
+            accepted.append(edit)
+
+    if not accepted:
+        return original
+
+    tokens = list(original_tokens)
+    for orig_start, orig_end, replacement in sorted(accepted, key=lambda e: e[0], reverse=True):
+        tokens[orig_start:orig_end] = replacement
+    return ' '.join(tokens)
+
+
+def self_consistent_correction(
+    client: OpenAI,
+    model: str,
+    messages: list,
+    text: str,
+    k: int = 5,
+    min_agreement: float = 0.5,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+    parse: Optional[Callable[[str, str], str]] = None,
+) -> str:
+    """k개 후보를 받아 편집 단위 다수결로 합친 교정문을 반환합니다. parse는 (출력, 원문) -> 교정문 파서입니다."""
+    raw_candidates = sample_candidates(client, model, messages, k, temperature=temperature, max_tokens=max_tokens)
+    candidates = [parse(c, text) if parse else c for c in raw_candidates]
+    return vote_edits(text, candidates, min_agreement=min_agreement, total=k)
@@ -0,0 +1,298 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Tuple
+
+# Prometheus 히스토그램 버킷 (초)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+# 모델별 기본 단가 (USD / 1K tokens, (prompt, completion)). 청구 단가가 다르면 --price_per_1k_* 옵션으로 덮어씁니다.
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "solar-pro2": (0.00015, 0.0006),
+}
+
+_ACTIVE: Optional["Telemetry"] = None
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """nearest-rank 방식 백분위수"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _labels(**labels) -> str:
+    body = ','.join(f'{k}="{str(v)}"' for k, v in labels.items())
+    return '{' + body + '}'
+
+
+class Telemetry:
+    """
+    chat.completions.create 호출마다 지연 시간, 토큰 사용량, 재시도, 캐시 히트, 오류를 기록합니다.
+    기록은 (script, step, model) 태그로 묶이며, 실행이 끝나면 요약 JSON과 OpenMetrics 텍스트로 내보냅니다.
+    비용은 MODEL_PRICES(+ prices로 덮어쓴 단가)로 계산하며, 단가를 모르는 모델은 비용을 None으로 둡니다.
+    """
+
+    def __init__(self, script: str, prices: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.script = script
+        self.prices = {**MODEL_PRICES, **(prices or {})}
+        self.started_at = time.time()
+        self.records: List[Dict] = []
+        self.events: Counter = Counter()
+        self.gauges: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # ------------------------------------------------------------------
+    # 기록
+    # ------------------------------------------------------------------
+    @property
+    def current_step(self) -> str:
+        return getattr(self._local, "step", "main")
+
+    @contextmanager
+    def step(self, name: str):
+        """이 블록 안의 API 호출에 프롬프트 단계(step) 태그를 붙입니다."""
+        previous = self.current_step
+        self._local.step = name
+        try:
+            yield
+        finally:
+            self._local.step = previous
+
+    def record_event(self, event: str, n: int = 1):
+        """원문 유지(fallback), 토큰 초과 스킵 등 API 호출 외 이벤트를 셉니다."""
+        with self._lock:
+            self.events[event] += n
+
+    def record_gauge(self, name: str, value: float):
+        """헤지 비율처럼 실행 단위로 한 번 정해지는 값을 기록합니다."""
+        with self._lock:
+            self.gauges[name] = value
+
+    def instrument(self, client):
+        """client.chat.completions.create를 계측 래퍼로 교체하고 client를 그대로 반환합니다."""
+        completions = client.chat.completions
+        create = completions.create
+        # with_raw_response는 SDK 내부 재시도 횟수(retries_taken)를 노출합니다. 교체 전에 잡아 둡니다.
+        raw_create = getattr(getattr(completions, "with_raw_response", None), "create", None)
+
+        def instrumented_create(*args, **kwargs):
+            step = self.current_step
+            model = kwargs.get("model", "unknown")
+            retries = 0
+            start = time.perf_counter()
+            try:
+                if raw_create is not None:
+                    raw = raw_create(*args, **kwargs)
+                    retries = getattr(raw, "retries_taken", 0) or 0
+                    resp = raw.parse()
+                else:
+                    resp = create(*args, **kwargs)
+            except Exception as e:
+                self._record(step, model, time.perf_counter() - start, None, retries, status="error", error=type(e).__name__)
+                raise
+            self._record(step, model, time.perf_counter() - start, getattr(resp, "usage", None), retries, status="ok")
+            return resp
+
+        completions.create = instrumented_create
+        return client
+
+    def _record(self, step: str, model: str, latency: float, usage, retries: int, status: str, error: Optional[str] = None):
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+        record = {
+            "step": step,
+            "model": model,
+            "latency": latency,
+            "prompt_tokens": (getattr(usage, "prompt_tokens", 0) or 0) if usage is not None else 0,
+            "completion_tokens": (getattr(usage, "completion_tokens", 0) or 0) if usage is not None else 0,
+            "cached_tokens": cached_tokens,
+            "retries": retries,
+            "status": status,
+            "error": error,
+        }
+        with self._lock:
+            self.records.append(record)
+            if cached_tokens:
+                self.events["cache_hit"] += 1
+
+    # ------------------------------------------------------------------
+    # 집계 / 내보내기
+    # ------------------------------------------------------------------
+    def cost(self, model: str, records: List[Dict]) -> Optional[float]:
+        """records의 prompt/completion 토큰에 model 단가를 곱한 비용(USD). 단가를 모르면 None"""
+        if model not in self.prices:
+            return None
+        prompt_price, completion_price = self.prices[model]
+        prompt_tokens = sum(r["prompt_tokens"] for r in records)
+        completion_tokens = sum(r["completion_tokens"] for r in records)
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+    def _groups(self) -> Dict[tuple, List[Dict]]:
+        groups = defaultdict(list)
+        with self._lock:
+            for record in self.records:
+                groups[(record["step"], record["model"])].append(record)
+        return groups
+
+    def summary(self) -> Dict:
+        """(step, model)별 지연 시간 백분위수와 토큰/오류/비용 합계를 포함한 실행 요약"""
+        groups = []
+        for (step, model), records in sorted(self._groups().items()):
+            latencies = sorted(r["latency"] for r in records)
+            histogram = [sum(1 for v in latencies if v <= le) for le in LATENCY_BUCKETS]
+            groups.append({
+                "script": self.script,
+                "step": step,
+                "model": model,
+                "requests": len(records),
+                "errors": sum(r["status"] == "error" for r in records),
+                "retries": sum(r["retries"] for r in records),
+                "prompt_tokens": sum(r["prompt_tokens"] for r in records),
+                "completion_tokens": sum(r["completion_tokens"] for r in records),
+                "cached_tokens": sum(r["cached_tokens"] for r in records),
+                "cost_usd": self.cost(model, records),
+                "latency_seconds": {
+                    "total": sum(latencies),
+                    "mean": sum(latencies) / len(latencies),
+                    "p50": _percentile(latencies, 50),
+                    "p95": _percentile(latencies, 95),
+                    "p99": _percentile(latencies, 99),
+                    "max": latencies[-1],
+                },
+                "latency_histogram": dict(zip([str(le) for le in LATENCY_BUCKETS] + ["+Inf"], histogram + [len(latencies)])),
+            })
+        return {
+            "script": self.script,
+            "started_at": self.started_at,
+            "wall_seconds": time.time() - self.started_at,
+            "groups": groups,
+            "cost_usd": sum(g["cost_usd"] for g in groups if g["cost_usd"] is not None),
+            "events": dict(self.events),
+            "gauges": dict(self.gauges),
+        }
+
+    def to_openmetrics(self) -> str:
+        """로컬 Prometheus(textfile collector 등)가 읽을 수 있는 OpenMetrics 텍스트"""
+        lines = [
+            "# TYPE gec_request_latency_seconds histogram",
+            "# UNIT gec_request_latency_seconds seconds",
+            "# HELP gec_request_latency_seconds Wall time of chat.completions.create calls.",
+        ]
+        groups = self._groups()
+        for (step, model), records in sorted(groups.items()):
+            latencies = [r["latency"] for r in records]
+            for le in LATENCY_BUCKETS:
+                count = sum(1 for v in latencies if v <= le)
+                lines.append(f"gec_request_latency_seconds_bucket{_labels(script=self.script, step=step, model=model, le=le)} {count}")
+            lines.append(f"gec_request_latency_seconds_bucket{_labels(script=self.script, step=step, model=model, le='+Inf')} {len(latencies)}")
+            lines.append(f"gec_request_latency_seconds_sum{_labels(script=self.script, step=step, model=model)} {sum(latencies)}")
+            lines.append(f"gec_request_latency_seconds_count{_labels(script=self.script, step=step, model=model)} {len(latencies)}")
+
+        lines += ["# TYPE gec_requests counter", "# HELP gec_requests API calls by outcome."]
+        for (step, model), records in sorted(groups.items()):
+            for status in ("ok", "error"):
+                count = sum(r["status"] == status for r in records)
+                lines.append(f"gec_requests_total{_labels(script=self.script, step=step, model=model, status=status)} {count}")
+
+        lines += ["# TYPE gec_tokens counter", "# HELP gec_tokens Tokens reported in resp.usage."]
+        for (step, model), records in sorted(groups.items()):
+            for kind in ("prompt", "completion", "cached"):
+                count = sum(r[f"{kind}_tokens"] for r in records)
+                lines.append(f"gec_tokens_total{_labels(script=self.script, step=step, model=model, kind=kind)} {count}")
+
+        lines += ["# TYPE gec_cost counter", "# HELP gec_cost Estimated API cost in USD from MODEL_PRICES (models without a price are omitted)."]
+        for (step, model), records in sorted(groups.items()):
+            cost = self.cost(model, records)
+            if cost is not None:
+                lines.append(f"gec_cost_total{_labels(script=self.script, step=step, model=model)} {cost}")
+
+        lines += ["# TYPE gec_retries counter", "# HELP gec_retries Retries taken inside the API client."]
+        for (step, model), records in sorted(groups.items()):
+            lines.append(f"gec_retries_total{_labels(script=self.script, step=step, model=model)} {sum(r['retries'] for r in records)}")
+
+        lines += ["# TYPE gec_events counter", "# HELP gec_events Non-request events such as fallback-to-original and cache hits."]
+        for event, count in sorted(self.events.items()):
+            lines.append(f"gec_events_total{_labels(script=self.script, event=event)} {count}")
+
+        for name, value in sorted(self.gauges.items()):
+            lines += [f"# TYPE gec_{name} gauge", f"gec_{name}{_labels(script=self.script)} {value}"]
+
+        lines.append("# EOF")
+        return '\n'.join(lines) + '\n'
+
+    def finish(self, output_dir: Optional[str] = None) -> Dict:
+        """요약을 출력하고, output_dir이 있으면 <script>_summary.json과 <script>.prom을 씁니다."""
+        summary = self.summary()
+        print("=== Telemetry ===")
+        for group in summary["groups"]:
+            latency = group["latency_seconds"]
+            cost = "n/a" if group["cost_usd"] is None else f"${group['cost_usd']:.4f}"
+            print(
+                f"[{group['step']}/{group['model']}] requests={group['requests']} errors={group['errors']} retries={group['retries']} "
+                f"tokens={group['prompt_tokens']}+{group['completion_tokens']} cost={cost} "
+                f"p50={latency['p50']:.2f}s p95={latency['p95']:.2f}s p99={latency['p99']:.2f}s"
+            )
+        if summary["events"]:
+            print(f"events: {summary['events']}")
+        if summary["gauges"]:
+            print(f"gauges: {summary['gauges']}")
+
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            summary_path = os.path.join(output_dir, f"{self.script}_summary.json")
+            with open(summary_path, "w", encoding="utf-8") as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+            # Prometheus가 같은 경로를 계속 읽을 수 있도록 원자적으로 교체
+            metrics_path = os.path.join(output_dir, f"{self.script}.prom")
+            with open(metrics_path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(self.to_openmetrics())
+            os.replace(metrics_path + ".tmp", metrics_path)
+            print(f"Telemetry saved to {summary_path}, {metrics_path}")
+        return summary
+
+
+def start(script: str, prices: Optional[Dict[str, Tuple[float, float]]] = None) -> Telemetry:
+    """실행 단위 Telemetry를 만들고 활성 인스턴스로 등록합니다."""
+    global _ACTIVE
+    _ACTIVE = Telemetry(script, prices=prices)
+    return _ACTIVE
+
+
+def add_price_arguments(parser):
+    """생성 스크립트 공통 단가 옵션. 지정하면 --model의 MODEL_PRICES 단가를 덮어씁니다."""
+    parser.add_argument("--price_per_1k_prompt", type=float, default=None, help="USD per 1K prompt tokens for --model (default: MODEL_PRICES in src/telemetry.py)")
+    parser.add_argument("--price_per_1k_completion", type=float, default=None, help="USD per 1K completion tokens for --model (default: MODEL_PRICES in src/telemetry.py)")
+
+
+def prices_from_args(args) -> Optional[Dict[str, Tuple[float, float]]]:
+    """--price_per_1k_* 옵션을 {model: (prompt, completion)}으로 바꿉니다. 빠진 쪽은 MODEL_PRICES 값을 씁니다."""
+    prompt_price = getattr(args, "price_per_1k_prompt", None)
+    completion_price = getattr(args, "price_per_1k_completion", None)
+    if prompt_price is None and completion_price is None:
+        return None
+    default_prompt, default_completion = MODEL_PRICES.get(args.model, (None, None))
+    prompt_price = default_prompt if prompt_price is None else prompt_price
+    completion_price = default_completion if completion_price is None else completion_price
+    if prompt_price is None or completion_price is None:
+        raise ValueError(f"No default price for model {args.model!r}; pass both --price_per_1k_prompt and --price_per_1k_completion.")
+    return {args.model: (prompt_price, completion_price)}
+
+
+def step(name: str):
+    """활성 Telemetry가 있으면 step 태그를 붙이고, 없으면 아무 것도 하지 않습니다."""
+    if _ACTIVE is None:
+        return nullcontext()
+    return _ACTIVE.step(name)
+
+
+def record_event(event: str, n: int = 1):
+    """활성 Telemetry가 있으면 이벤트를 셉니다."""
+    if _ACTIVE is not None:
+        _ACTIVE.record_event(event, n)
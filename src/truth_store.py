@@ -0,0 +1,284 @@
+"""
+정답 CSV를 미리 토큰화한 바이너리 형식(.npy 디렉터리)으로 한 번만 컴파일하고, 이후에는 메모리 매핑으로 읽습니다.
+
+    python cli.py truth-store compile --true_df data/train_dataset.csv --output data/train_dataset.truth
+    python cli.py evaluate --truth_store data/train_dataset.truth --pred_df submission.csv
+
+디렉터리 구성 (모든 배열은 np.load(mmap_mode='r')로 열려 여러 프로세스가 같은 페이지를 공유합니다):
+    vocab.*                         토큰 어휘 (utf-8 바이트 + 오프셋)
+    err_tokens / err_offsets        원문 토큰 id (int32, 평탄화) / 행별 시작 위치 (int64, n+1)
+    cor_tokens / cor_offsets        정답 토큰 id / 행별 시작 위치
+    edits / edit_offsets            정답 차이점 (orig_start, orig_end, corr_start, corr_end) / 행별 시작 위치
+    edit_orig.* / edit_corr.*       정답 차이점의 원문/교정 구간 문자열 (merge_close_differences 결과 그대로)
+    col_<name>.*                    원본 CSV의 문자열 컬럼 (err_sentence, cor_sentence, type, id 등)
+    meta.json                       형식 버전, 행 수, 컬럼 목록, 원본 CSV 크기/수정 시각 (마지막에 기록)
+"""
+import argparse
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+
+
+def _pack_strings(values: Sequence[Optional[str]]) -> Dict[str, np.ndarray]:
+    """문자열 목록을 utf-8 바이트 배열 + 오프셋 (+ 결측 마스크)으로 변환"""
+    encoded = [b"" if v is None else v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return {
+        "bytes": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "offsets": offsets,
+        "isna": np.array([v is None for v in values], dtype=bool),
+    }
+
+
+def _save(output_dir: str, name: str, array: np.ndarray):
+    np.save(os.path.join(output_dir, f"{name}.npy"), array, allow_pickle=False)
+
+
+def compile_truth(true_df_path: str, output_dir: str) -> Dict:
+    """정답 CSV를 토큰 어휘 / int32 토큰 배열 / 정답 차이점으로 컴파일합니다."""
+    import pandas as pd
+    from src import metrics
+
+    true_df = pd.read_csv(true_df_path)
+    if not {"err_sentence", "cor_sentence"}.issubset(true_df.columns):
+        raise ValueError(f"Truth DF must have columns 'err_sentence' and 'cor_sentence' (found: {list(true_df.columns)})")
+    os.makedirs(output_dir, exist_ok=True)
+    meta_path = os.path.join(output_dir, META_FILE)
+    if os.path.exists(meta_path):
+        # 쓰는 도중 실패하면 불완전한 디렉터리가 유효하게 보이지 않도록 meta.json을 먼저 지움
+        os.remove(meta_path)
+
+    vocab: Dict[str, int] = {}
+
+    def encode(tokens: List[str]) -> List[int]:
+        return [vocab.setdefault(t, len(vocab)) for t in tokens]
+
+    err_ids, err_offsets = [], [0]
+    cor_ids, cor_offsets = [], [0]
+    edits, edit_offsets, edit_orig, edit_corr = [], [0], [], []
+    for err, cor in zip(true_df["err_sentence"], true_df["cor_sentence"]):
+        err_tokens, cor_tokens = metrics.tokenize(err), metrics.tokenize(cor)
+        err_ids.extend(encode(err_tokens))
+        err_offsets.append(len(err_ids))
+        cor_ids.extend(encode(cor_tokens))
+        cor_offsets.append(len(cor_ids))
+
+        for orig_text, corr_text, *span in metrics.merge_close_differences(metrics.diff_tokens(err_tokens, cor_tokens)):
+            edits.append(span)
+            edit_orig.append(orig_text)
+            edit_corr.append(corr_text)
+        edit_offsets.append(len(edits))
+
+    _save(output_dir, "err_tokens", np.asarray(err_ids, dtype=np.int32))
+    _save(output_dir, "err_offsets", np.asarray(err_offsets, dtype=np.int64))
+    _save(output_dir, "cor_tokens", np.asarray(cor_ids, dtype=np.int32))
+    _save(output_dir, "cor_offsets", np.asarray(cor_offsets, dtype=np.int64))
+    _save(output_dir, "edits", np.asarray(edits, dtype=np.int32).reshape(-1, 4))
+    _save(output_dir, "edit_offsets", np.asarray(edit_offsets, dtype=np.int64))
+
+    string_arrays = {"vocab": list(vocab), "edit_orig": edit_orig, "edit_corr": edit_corr}
+    columns = [c for c in true_df.columns if not pd.api.types.is_numeric_dtype(true_df[c]) or c in ("id", "type")]
+    for column in columns:
+        string_arrays[f"col_{column}"] = [None if pd.isna(v) else str(v) for v in true_df[column]]
+    for name, values in string_arrays.items():
+        for part, array in _pack_strings(values).items():
+            _save(output_dir, f"{name}.{part}", array)
+
+    stat = os.stat(true_df_path)
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "rows": len(true_df),
+        "vocab_size": len(vocab),
+        "tokens": len(err_ids) + len(cor_ids),
+        "golden_edits": len(edits),
+        "columns": columns,
+        "source": os.path.abspath(true_df_path),
+        "source_size": stat.st_size,
+        "source_mtime": stat.st_mtime,
+    }
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+class StringColumn:
+    """메모리 매핑된 utf-8 문자열 배열 (필요한 행만 디코딩). 결측 행은 na_value를 반환합니다."""
+
+    def __init__(self, store_dir: str, name: str, na_value: Optional[str] = None):
+        self._bytes = np.load(os.path.join(store_dir, f"{name}.bytes.npy"), mmap_mode="r")
+        self._offsets = np.load(os.path.join(store_dir, f"{name}.offsets.npy"), mmap_mode="r")
+        self._isna = np.load(os.path.join(store_dir, f"{name}.isna.npy"), mmap_mode="r")
+        self.na_value = na_value
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        if i < 0 or i >= len(self):
+            raise IndexError(i)
+        if self._isna[i]:
+            return self.na_value
+        return self._bytes[self._offsets[i]:self._offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def tolist(self) -> List[Optional[str]]:
+        data = self._bytes.tobytes()
+        offsets = self._offsets.tolist()
+        isna = self._isna.tolist()
+        return [self.na_value if isna[i] else data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(self))]
+
+    def equals(self, values: Sequence[Optional[str]]) -> bool:
+        """values와 행마다 같은지 디코딩 없이 utf-8 바이트로 비교합니다 (결측 행은 None/NaN 또는 na_value와 같다고 봄)."""
+        if len(values) != len(self):
+            return False
+        values = list(values)
+        for i in np.flatnonzero(self._isna).tolist():
+            v = values[i]
+            if not (v is None or v != v or v == self.na_value):
+                return False
+            values[i] = ""
+        if any(not isinstance(v, str) for v in values):
+            return False
+        packed = _pack_strings(values)
+        return np.array_equal(packed["offsets"], self._offsets) and np.array_equal(packed["bytes"], self._bytes)
+
+
+class _RowView:
+    """store의 행별 접근자를 metrics.evaluate_correction이 인덱싱할 수 있는 시퀀스로 노출"""
+
+    def __init__(self, n: int, getter):
+        self._n = n
+        self._getter = getter
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i: int):
+        return self._getter(i)
+
+
+class TruthStore:
+    """compile_truth로 만든 디렉터리를 메모리 매핑으로 엽니다."""
+
+    def __init__(self, store_dir: str):
+        self.path = os.path.abspath(store_dir)
+        meta_path = os.path.join(self.path, META_FILE)
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"Truth store not found or incomplete (missing {META_FILE}): {self.path}")
+        with open(meta_path, encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported truth store format {self.meta.get('format_version')} (expected {FORMAT_VERSION}). Recompile it.")
+        self.mtime = os.path.getmtime(meta_path)
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+
+        self.err_tokens, self.err_offsets = load("err_tokens"), load("err_offsets")
+        self.cor_tokens, self.cor_offsets = load("cor_tokens"), load("cor_offsets")
+        self.edits, self.edit_offsets = load("edits"), load("edit_offsets")
+        self.vocab = StringColumn(self.path, "vocab")
+        self.edit_orig = StringColumn(self.path, "edit_orig")
+        self.edit_corr = StringColumn(self.path, "edit_corr")
+        self._vocab_list = None
+
+        self.original_tokens = _RowView(len(self), self.original_tokens_at)
+        self.golden_differences = _RowView(len(self), self.golden_differences_at)
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    @property
+    def columns(self) -> List[str]:
+        return self.meta["columns"]
+
+    def is_stale(self) -> bool:
+        """원본 CSV가 컴파일 이후 바뀌었는지 (원본이 없으면 False)"""
+        source = self.meta.get("source")
+        if not source or not os.path.exists(source):
+            return False
+        stat = os.stat(source)
+        return stat.st_size != self.meta["source_size"] or stat.st_mtime != self.meta["source_mtime"]
+
+    def column(self, name: str, na_value: Optional[str] = None) -> StringColumn:
+        """원본 CSV 문자열 컬럼의 지연 디코딩 뷰"""
+        if name not in self.columns:
+            raise KeyError(f"Column '{name}' not in truth store (found: {self.columns})")
+        return StringColumn(self.path, f"col_{name}", na_value=na_value)
+
+    def _decode_tokens(self, ids: np.ndarray) -> List[str]:
+        if self._vocab_list is None:
+            self._vocab_list = self.vocab.tolist()
+        return [self._vocab_list[t] for t in ids.tolist()]
+
+    def original_tokens_at(self, i: int) -> List[str]:
+        return self._decode_tokens(self.err_tokens[self.err_offsets[i]:self.err_offsets[i + 1]])
+
+    def corrected_tokens_at(self, i: int) -> List[str]:
+        return self._decode_tokens(self.cor_tokens[self.cor_offsets[i]:self.cor_offsets[i + 1]])
+
+    def golden_differences_at(self, i: int) -> List[Tuple[str, str, int, int, int, int]]:
+        """metrics.find_differences_with_offsets(err_sentence, cor_sentence)와 같은 결과"""
+        start, end = int(self.edit_offsets[i]), int(self.edit_offsets[i + 1])
+        return [
+            (self.edit_orig[k], self.edit_corr[k], *(int(x) for x in self.edits[k]))
+            for k in range(start, end)
+        ]
+
+    def to_frame(self, columns: Optional[Sequence[str]] = None):
+        """문자열 컬럼을 원본 CSV와 같은 DataFrame으로 복원 (토큰화 없이). columns를 주면 store에 있는 것만 디코딩합니다."""
+        import pandas as pd
+
+        names = self.columns if columns is None else [c for c in columns if c in self.columns]
+        return pd.DataFrame({name: self.column(name).tolist() for name in names}, index=pd.RangeIndex(len(self)))
+
+
+def open_truth(path: str, columns: Optional[Sequence[str]] = None):
+    """
+    정답 CSV 경로이면 (DataFrame, None), 컴파일된 디렉터리이면 (DataFrame, TruthStore)를 반환하는 분석 스크립트용 헬퍼.
+    store에서는 columns에 있는 컬럼만 DataFrame으로 디코딩하므로, 문장 컬럼은 빼고 store.column()으로 필요한 행만 읽으세요.
+    """
+    import pandas as pd
+
+    if os.path.isdir(path):
+        store = TruthStore(path)
+        if store.is_stale():
+            print(f"Warning: {store.meta['source']} changed after the truth store was compiled. Recompile {path}.")
+        return store.to_frame(columns), store
+    return pd.read_csv(path), None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the truth CSV into a pre-tokenized, memory-mappable binary store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_compile = sub.add_parser("compile", help="Tokenize the truth CSV once and write the binary store")
+    p_compile.add_argument("--true_df", default="data/train_dataset.csv", help="Path to ground truth CSV containing err_sentence, cor_sentence")
+    p_compile.add_argument("--output", default="data/train_dataset.truth", help="Output directory for the store")
+
+    p_info = sub.add_parser("info", help="Show the metadata of a compiled store")
+    p_info.add_argument("--truth_store", default="data/train_dataset.truth", help="Path to a compiled store directory")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compile":
+        meta = compile_truth(args.true_df, args.output)
+        print(f"✅ Truth store written to {args.output} ({meta['rows']} rows, {meta['vocab_size']} vocab, {meta['golden_edits']} golden edits)")
+
+    elif args.command == "info":
+        store = TruthStore(args.truth_store)
+        print(json.dumps(store.meta, ensure_ascii=False, indent=2))
+        if store.is_stale():
+            print("Warning: the source CSV changed after compilation. Recompile the store.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+SQLite 기반 lease 작업 큐로 생성 스크립트를 여러 프로세스/여러 API 키로 수평 확장합니다.
+
+    python cli.py queue init    --db runs/test.sqlite --input data/test.csv --batch_size 20
+    python cli.py queue work    --db runs/test.sqlite --mode multi-turn --workers 4
+    python cli.py queue status  --db runs/test.sqlite
+    python cli.py queue collect --db runs/test.sqlite --output submission/test_queue.csv
+
+워커는 배치 단위로 lease를 잡고, 문장을 하나 처리할 때마다 lease를 연장합니다. 워커가 죽어 lease가 만료되면
+배치는 다른 워커가 다시 가져갑니다. API 키는 UPSTAGE_API_KEYS(쉼표 구분, 없으면 UPSTAGE_API_KEY)에서 읽으며,
+각 워커는 키 슬롯도 lease로 잡아 서로 다른 키를 사용합니다. DB에는 키 자체가 아니라 슬롯 번호만 저장합니다.
+공유 파일시스템에서 여러 머신이 같은 DB를 쓸 때는 SQLite 파일 잠금이 보장되는 파일시스템이어야 합니다.
+"""
+import argparse
+import importlib
+import multiprocessing
+import os
+import random
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
+
+import pandas as pd
+
+from src import chunking, hedging, telemetry
+
+# --mode -> 문장 하나를 교정하는 함수 (client, model, text) -> str. 실제 사용할 때만 import 합니다.
+# 긴 입력의 분할 예산은 같은 모듈의 max_text_tokens()를 사용합니다.
+MODES = {
+    "generate": "src.baseline_generate:baseline_correction",
+    "multi-turn": "src.multi_turn_generate:multi_turn_correction",
+    "retry": "src.retry_generate:retry_correction",
+    "retry-v2": "src.retry_generate_v2:retry_correction_multi_turn_v2",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    err_sentence TEXT NOT NULL,
+    batch INTEGER NOT NULL,
+    cor_sentence TEXT
+);
+CREATE INDEX IF NOT EXISTS rows_batch ON rows(batch);
+CREATE TABLE IF NOT EXISTS batches (
+    batch INTEGER PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS key_slots (
+    slot INTEGER PRIMARY KEY,
+    owner TEXT,
+    lease_expires REAL
+);
+"""
+
+
+def resolve_mode(mode: str) -> Tuple[Callable, Callable[[], int]]:
+    """(교정 함수, 입력 문장 토큰 예산 함수)"""
+    module_name, func_name = MODES[mode].split(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, func_name), module.max_text_tokens
+
+
+def load_key_pool() -> List[str]:
+    """UPSTAGE_API_KEYS(쉼표 구분) 또는 UPSTAGE_API_KEY에서 키 목록을 읽습니다."""
+    keys = [k.strip() for k in os.getenv("UPSTAGE_API_KEYS", "").split(",") if k.strip()]
+    if not keys and os.getenv("UPSTAGE_API_KEY"):
+        keys = [os.getenv("UPSTAGE_API_KEY")]
+    if not keys:
+        raise ValueError("UPSTAGE_API_KEYS / UPSTAGE_API_KEY not found in environment variables. Please check your .env file.")
+    return keys
+
+
+class WorkQueue:
+    """배치 단위 lease 큐. 모든 상태 변경은 BEGIN IMMEDIATE 트랜잭션으로 직렬화됩니다."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self.conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT. 예외가 나면 ROLLBACK해서 연결이 열린 트랜잭션에 남지 않게 합니다."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def init(self, df: pd.DataFrame, batch_size: int) -> int:
+        """입력 행을 배치로 나누어 등록합니다. 이미 등록된 큐는 다시 만들지 않습니다."""
+        if self.conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]:
+            raise ValueError(f"Queue {self.db_path} is already initialized.")
+        ids = df["id"].astype(str).tolist() if "id" in df.columns else [str(i) for i in range(1, len(df) + 1)]
+        texts = df["err_sentence"].astype(str).tolist()
+        n_batches = (len(texts) + batch_size - 1) // batch_size
+
+        with self._transaction():
+            self.conn.executemany(
+                "INSERT INTO rows (seq, id, err_sentence, batch) VALUES (?, ?, ?, ?)",
+                [(seq, ids[seq], texts[seq], seq // batch_size) for seq in range(len(texts))],
+            )
+            self.conn.executemany("INSERT INTO batches (batch) VALUES (?)", [(b,) for b in range(n_batches)])
+        return n_batches
+
+    def lease(self, owner: str, lease_seconds: float, max_attempts: int) -> Optional[int]:
+        """대기 중이거나 lease가 만료된 배치 하나를 잡습니다. 시도 횟수를 넘긴 배치는 failed로 표시합니다."""
+        now = time.time()
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE batches SET status = 'failed', owner = NULL "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, max_attempts),
+            )
+            row = self.conn.execute(
+                "SELECT batch FROM batches WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY attempts, batch LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE batches SET status = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 WHERE batch = ?",
+                (owner, now + lease_seconds, row[0]),
+            )
+            return row[0]
+
+    def renew(self, batch: int, owner: str, lease_seconds: float) -> bool:
+        """lease를 연장합니다. 이미 다른 워커가 가져갔으면 False."""
+        cur = self.conn.execute(
+            "UPDATE batches SET lease_expires = ? WHERE batch = ? AND owner = ? AND status = 'leased'",
+            (time.time() + lease_seconds, batch, owner),
+        )
+        return cur.rowcount == 1
+
+    def batch_rows(self, batch: int) -> List[Tuple[int, str]]:
+        return self.conn.execute("SELECT seq, err_sentence FROM rows WHERE batch = ? ORDER BY seq", (batch,)).fetchall()
+
+    def complete(self, batch: int, results: List[Tuple[int, str]]) -> bool:
+        """결과를 기록하고 배치를 완료 처리합니다. 먼저 끝낸 워커의 결과만 반영합니다."""
+        with self._transaction():
+            status = self.conn.execute("SELECT status FROM batches WHERE batch = ?", (batch,)).fetchone()[0]
+            if status == "done":
+                return False
+            self.conn.executemany("UPDATE rows SET cor_sentence = ? WHERE seq = ?", [(cor, seq) for seq, cor in results])
+            self.conn.execute("UPDATE batches SET status = 'done', owner = NULL, lease_expires = NULL WHERE batch = ?", (batch,))
+            return True
+
+    def acquire_key_slot(self, owner: str, n_keys: int, lease_seconds: float) -> int:
+        """비어 있거나 lease가 만료된 API 키 슬롯을 잡습니다. 모두 사용 중이면 임의의 슬롯을 공유합니다."""
+        now = time.time()
+        with self._transaction():
+            self.conn.executemany("INSERT OR IGNORE INTO key_slots (slot) VALUES (?)", [(s,) for s in range(n_keys)])
+            row = self.conn.execute(
+                "SELECT slot FROM key_slots WHERE slot < ? AND (owner IS NULL OR lease_expires < ?) ORDER BY slot LIMIT 1",
+                (n_keys, now),
+            ).fetchone()
+            if row is not None:
+                self.conn.execute("UPDATE key_slots SET owner = ?, lease_expires = ? WHERE slot = ?", (owner, now + lease_seconds, row[0]))
+                return row[0]
+        slot = random.randrange(n_keys)
+        print(f"[Warning] 사용 가능한 API 키 슬롯이 없어 슬롯 {slot}을 공유합니다.")
+        return slot
+
+    def renew_key_slot(self, slot: int, owner: str, lease_seconds: float):
+        self.conn.execute("UPDATE key_slots SET lease_expires = ? WHERE slot = ? AND owner = ?", (time.time() + lease_seconds, slot, owner))
+
+    def release_key_slot(self, slot: int, owner: str):
+        self.conn.execute("UPDATE key_slots SET owner = NULL, lease_expires = NULL WHERE slot = ? AND owner = ?", (slot, owner))
+
+    def status(self) -> dict:
+        counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM batches GROUP BY status").fetchall())
+        done_rows = self.conn.execute("SELECT COUNT(*) FROM rows WHERE cor_sentence IS NOT NULL").fetchone()[0]
+        total_rows = self.conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+        return {"batches": counts, "rows_done": done_rows, "rows_total": total_rows}
+
+    def has_open_batches(self) -> bool:
+        return self.conn.execute("SELECT COUNT(*) FROM batches WHERE status IN ('pending', 'leased')").fetchone()[0] > 0
+
+    def collect(self) -> pd.DataFrame:
+        """완료된 결과를 원래 순서대로 모읍니다. 실패/미완료 행은 원문을 유지합니다 (생성 스크립트와 같은 fallback)."""
+        df = pd.read_sql_query("SELECT id, err_sentence, cor_sentence FROM rows ORDER BY seq", self.conn)
+        df["cor_sentence"] = df["cor_sentence"].fillna(df["err_sentence"])
+        return df
+
+
+def run_worker(db_path: str, mode: str, model: str, lease_seconds: float = 300, max_attempts: int = 3,
+               key_index: Optional[int] = None, telemetry_dir: Optional[str] = None, hedge: bool = False,
+               hedge_percentile: float = 95, hedge_max_rate: float = 0.1, prices: Optional[dict] = None,
+               max_chunk_tokens: Optional[int] = None, chunk_workers: int = 4):
+    """큐가 빌 때까지 배치를 lease해서 처리합니다."""
+    from dotenv import load_dotenv
+    from openai import OpenAI
+
+    load_dotenv()
+    queue = WorkQueue(db_path)
+    owner = f"{socket.gethostname()}-{os.getpid()}"
+    keys = load_key_pool()
+    slot = key_index % len(keys) if key_index is not None else queue.acquire_key_slot(owner, len(keys), lease_seconds)
+    correct, max_text_tokens = resolve_mode(mode)
+    max_chunk_tokens = max_chunk_tokens or max_text_tokens()
+
+    tel = telemetry.start(f"queue_{mode}_{owner}", prices=prices)
+    client = tel.instrument(OpenAI(api_key=keys[slot], base_url="https://api.upstage.ai/v1"))
+    hedge_args = argparse.Namespace(hedge=hedge, hedge_percentile=hedge_percentile, hedge_max_rate=hedge_max_rate)
+    hedger = hedging.from_args(hedge_args, client, tel)
+    print(f"[{owner}] mode={mode} model={model} key_slot={slot} max_chunk_tokens={max_chunk_tokens}")
+
+    processed = 0
+    try:
+        while True:
+            batch = queue.lease(owner, lease_seconds, max_attempts)
+            if batch is None:
+                if not queue.has_open_batches():
+                    break
+                # 다른 워커가 잡고 있는 배치의 lease 만료를 기다림
+                time.sleep(min(5.0, lease_seconds / 2))
+                continue
+
+            results = []
+            for seq, text in queue.batch_rows(batch):
+                corrected = chunking.correct_chunked(
+                    lambda chunk: correct(client, model, chunk),
+                    text, max_chunk_tokens, chunking.count_text_tokens, max_workers=chunk_workers,
+                )
+                results.append((seq, corrected))
+                if not queue.renew(batch, owner, lease_seconds):
+                    # lease가 만료되어 다른 워커가 가져간 배치: 더 이상 API를 호출하지 않고 결과를 버림
+                    print(f"[{owner}] lost lease on batch {batch}; dropping {len(results)} rows")
+                    results = None
+                    break
+                if key_index is None:
+                    queue.renew_key_slot(slot, owner, lease_seconds)
+            if results is not None and queue.complete(batch, results):
+                processed += len(results)
+                print(f"[{owner}] batch {batch} done ({len(results)} rows)")
+    finally:
+        if key_index is None:
+            queue.release_key_slot(slot, owner)
+        if hedger is not None:
+            hedger.finish()
+        tel.finish(telemetry_dir)
+    print(f"[{owner}] finished: {processed} rows")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lease-based SQLite work queue for sharded, multi-key generation runs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_init = sub.add_parser("init", help="Create a queue from an input CSV")
+    p_init.add_argument("--db", required=True, help="SQLite queue path")
+    p_init.add_argument("--input", default="data/test.csv", help="Input CSV path containing err_sentence column")
+    p_init.add_argument("--batch_size", type=int, default=20, help="Rows per leased batch")
+
+    p_work = sub.add_parser("work", help="Run workers until the queue is drained")
+    p_work.add_argument("--db", required=True, help="SQLite queue path")
+    p_work.add_argument("--mode", choices=MODES, default="multi-turn", help="Which generation strategy to run")
+    p_work.add_argument("--model", default="solar-pro2", help="Model name (default: solar-pro2)")
+    p_work.add_argument("--workers", type=int, default=1, help="Worker processes to start on this machine")
+    p_work.add_argument("--lease_seconds", type=float, default=300, help="Lease duration; expired batches are re-queued")
+    p_work.add_argument("--max_attempts", type=int, default=3, help="Give up on a batch after this many expired leases")
+    p_work.add_argument("--key_index", type=int, default=None, help="Pin this worker to a key in UPSTAGE_API_KEYS instead of leasing a key slot")
+    p_work.add_argument("--telemetry_dir", default=None, help="Directory for per-worker telemetry files (optional)")
+    hedging.add_hedge_arguments(p_work)
+    telemetry.add_price_arguments(p_work)
+    chunking.add_chunk_arguments(p_work)
+
+    p_status = sub.add_parser("status", help="Show queue progress")
+    p_status.add_argument("--db", required=True, help="SQLite queue path")
+
+    p_collect = sub.add_parser("collect", help="Write finished results as id,err_sentence,cor_sentence CSV")
+    p_collect.add_argument("--db", required=True, help="SQLite queue path")
+    p_collect.add_argument("--output", default="submission/queue_submission.csv", help="Output CSV path")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "init":
+        df = pd.read_csv(args.input)
+        if "err_sentence" not in df.columns:
+            raise ValueError("Input CSV must contain 'err_sentence' column")
+        if os.path.dirname(args.db):
+            os.makedirs(os.path.dirname(args.db), exist_ok=True)
+        n_batches = WorkQueue(args.db).init(df, args.batch_size)
+        print(f"✅ Queue initialized: {len(df)} rows in {n_batches} batches -> {args.db}")
+
+    elif args.command == "work":
+        worker_kwargs = dict(
+            db_path=args.db, mode=args.mode, model=args.model, lease_seconds=args.lease_seconds,
+            max_attempts=args.max_attempts, key_index=args.key_index, telemetry_dir=args.telemetry_dir,
+            hedge=args.hedge, hedge_percentile=args.hedge_percentile, hedge_max_rate=args.hedge_max_rate,
+            prices=telemetry.prices_from_args(args),
+            max_chunk_tokens=args.max_chunk_tokens, chunk_workers=args.chunk_workers,
+        )
+        if args.workers == 1:
+            run_worker(**worker_kwargs)
+        else:
+            processes = [multiprocessing.Process(target=run_worker, kwargs=worker_kwargs) for _ in range(args.workers)]
+            for p in processes:
+                p.start()
+            for p in processes:
+                p.join()
+        print(f"Queue status: {WorkQueue(args.db).status()}")
+
+    elif args.command == "status":
+        print(WorkQueue(args.db).status())
+
+    elif args.command == "collect":
+        queue = WorkQueue(args.db)
+        status = queue.status()
+        if status["rows_done"] < status["rows_total"]:
+            print(f"[Warning] {status['rows_total'] - status['rows_done']} rows are not finished; keeping err_sentence for them.")
+        out_df = queue.collect()
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        out_df.to_csv(args.output, index=False)
+        print(f"✅ Collected {len(out_df)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()